@@ -116,6 +116,44 @@ def update_data(symbol, data, last_date):
     update_last_date(symbol, last_date)
 
 
+# Insert stock data for many symbols and update their last dates in one transaction
+def bulk_ingest(issuer_data, batch_size=1000):
+    db_path = os.path.join('data', 'stock_data.db')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    inserted = skipped = 0
+    try:
+        for symbol, data, last_date in issuer_data:
+            bulk_data = [
+                (symbol, row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
+                for row in data
+            ]
+            for start in range(0, len(bulk_data), batch_size):
+                batch = bulk_data[start:start + batch_size]
+                cursor.executemany('''
+                       INSERT OR IGNORE INTO StockData (
+                           Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
+                           Volume, TurnoverInBEST, TotalTurnover
+                       ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ''', batch)
+                # Rows that already existed are ignored and not counted in rowcount
+                inserted += cursor.rowcount
+                skipped += len(batch) - cursor.rowcount
+
+            cursor.execute('''
+            UPDATE SymbolTracking
+            SET LastDate = ?
+            WHERE Symbol = ?
+            ''', (last_date, symbol))
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {"inserted": inserted, "skipped": skipped}
+
+
 # Retrieve the last saved date for a symbol to resume scraping
 def get_last_saved_date(symbol):
     db_path = os.path.join('data', 'stock_data.db')
@@ -95,27 +95,33 @@ def reformat_number(value):
 #                     writer.writerow(formatted_row)  # Include issuer code in each row
 #     print("Data saved to all_issuers_data.csv")
 
+def format_rows(data):
+    """Reformats the numeric fields of scraped rows for the database."""
+    formatted_data = []
+    for row in data:
+        # Date and symbol remain as strings, others are converted to numbers
+        formatted_row = [
+            row[0],  # Date
+            reformat_number(row[1]),  # LastTradePrice
+            reformat_number(row[2]),  # Max
+            reformat_number(row[3]),  # Min
+            reformat_number(row[4]),  # AvgPrice
+            reformat_number(row[5]),  # PercentageChange
+            str(reformat_number(row[6])),  # Volume
+            str(reformat_number(row[7])),  # TurnoverInBEST
+            str(reformat_number(row[8]))  # TotalTurnover
+        ]
+        formatted_data.append(formatted_row)
+    return formatted_data
+
+
 def save_to_database(results, issuers):
     """Saves all issuer data to the database."""
     for issuer, data in zip(issuers, results):
         if data:
-            formatted_data = []
-            for row in data:
-                # Date and symbol remain as strings, others are converted to numbers
-                formatted_row = [
-                    row[0],  # Date
-                    reformat_number(row[1]),  # LastTradePrice
-                    reformat_number(row[2]),  # Max
-                    reformat_number(row[3]),  # Min
-                    reformat_number(row[4]),  # AvgPrice
-                    reformat_number(row[5]),  # PercentageChange
-                    str(reformat_number(row[6])),  # Volume
-                    str(reformat_number(row[7])),  # TurnoverInBEST
-                    str(reformat_number(row[8]))  # TotalTurnover
-                ]
-                formatted_data.append(formatted_row)
             # Insert formatted data into the database
-            insert_stock_data(issuer, formatted_data)
+            insert_stock_data(issuer, format_rows(data))
+
 
 
 
@@ -2,8 +2,8 @@ from F1 import filter_1
 from multiprocessing import Pool, cpu_count
 import asyncio
 from F2 import filter_2
-from F3 import filter_3, save_to_database
-from DB import update_last_date, init_createDB
+from F3 import filter_3, format_rows
+from DB import bulk_ingest, init_createDB
 from datetime import datetime
 import time
 
@@ -21,11 +21,10 @@ def scrape_all_issuers(issuers, end_date):
     with Pool(cpu_count()) as pool:
         results = pool.map(process_issuer, issuers)  
 
-    for issuer, data in results:
-        save_to_database([data], [issuer])
-        update_last_date(issuer, end_date)
+    # One transaction for every issuer instead of two commits per issuer
+    result = bulk_ingest([(issuer, format_rows(data or []), end_date) for issuer, data in results])
 
-    print("Scraping completed.")
+    print(f"Scraping completed. Inserted {result['inserted']} rows, skipped {result['skipped']}.")
 
 
 if __name__ == "__main__":
@@ -1,37 +1,715 @@
 import sqlite3
 import os
 import csv
+import functools
+import logging
+import math
+import sys
+import sysconfig
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+try:
+    import duckdb
+except ImportError:  # Optional analytical backend, aggregate_stock_data falls back to SQLite
+    duckdb = None
+
+ANALYTICS_ENABLED = duckdb is not None
+
+# Bumped whenever the StockData layout changes; stored in PRAGMA user_version
+STOCK_DATA_SCHEMA_VERSION = 1
+
+STOCK_DATA_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    Symbol TEXT,
+    Date TEXT,
+    LastTradePrice REAL,
+    Max REAL,
+    Min REAL,
+    AvgPrice REAL,
+    PercentageChange REAL,
+    Volume INTEGER,
+    TurnoverInBEST REAL,
+    TotalTurnover REAL,
+    PRIMARY KEY (Symbol, Date),
+    FOREIGN KEY (Symbol) REFERENCES SymbolTracking(Symbol)
+)
+'''
+
+# Snapshot of the latest trading day, kept up to date by insert_stock_data so the
+# dashboard never has to scan StockData
+MARKET_SUMMARY_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS DailyMarketSummary (
+    Date TEXT,
+    Symbol TEXT,
+    AvgPrice REAL,
+    PercentageChange REAL,
+    Volume INTEGER,
+    TotalTurnover REAL,
+    PRIMARY KEY (Date, Symbol)
+)
+'''
+
+# Per-day fields derived from StockData by the ingest path (see derive_returns), so the
+# analysis services don't recompute them on every request
+STOCK_RETURNS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS StockReturns (
+    Symbol TEXT,
+    Date TEXT,
+    Close REAL,
+    PriceChange REAL,
+    DailyReturn REAL,
+    LogReturn REAL,
+    TrueRange REAL,
+    Volume INTEGER,
+    CumLogReturn REAL,
+    Position INTEGER,
+    PRIMARY KEY (Symbol, Date)
+)
+'''
+
+# Columns added to StockReturns after it first shipped; init_createDB adds any that are
+# missing and has the table rebuilt
+STOCK_RETURNS_ADDED_COLUMNS = (('CumLogReturn', 'REAL'), ('Position', 'INTEGER'))
+
+# Sparse table over each symbol's daily highs and lows: the row at (Level, Position) holds
+# the highest Max and lowest Min of the 2^Level trading days starting at Position (the
+# symbol's StockReturns.Position). Any range of days is covered by two overlapping
+# entries of one level, so range highs/lows take two lookups however long the range is.
+STOCK_RANGE_INDEX_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS StockRangeIndex (
+    Symbol TEXT,
+    Level INTEGER,
+    Position INTEGER,
+    High REAL,
+    Low REAL,
+    PRIMARY KEY (Symbol, Level, Position)
+) WITHOUT ROWID
+'''
+
+# Days the exchange traded on, as seen in StockData; the observed part of the trading calendar
+TRADING_DAYS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS TradingDays (
+    Date TEXT PRIMARY KEY
+) WITHOUT ROWID
+'''
+
+# History windows (ISO dates) whose rows are stored although the symbol's watermark hasn't
+# reached them yet, because an earlier window is still missing. An interrupted or partly
+# failed refresh resumes from these; bulk_ingest drops the ones a watermark has passed.
+FETCH_CHECKPOINTS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS FetchCheckpoints (
+    Symbol TEXT,
+    FromDate TEXT,
+    ToDate TEXT,
+    PRIMARY KEY (Symbol, FromDate)
+) WITHOUT ROWID
+'''
+
+# Closed years of StockData compacted by compact_history: one zlib-compressed, column-major
+# block per (symbol, year). Readers in this module stitch the blocks back in.
+STOCK_DATA_ARCHIVE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS StockDataArchive (
+    Symbol TEXT,
+    Year INTEGER,
+    Rows INTEGER,
+    FirstDate TEXT,
+    LastDate TEXT,
+    Block BLOB,
+    PRIMARY KEY (Symbol, Year)
+)
+'''
+
+# Per-symbol lookups use the (Symbol, Date) primary key, which sorts correctly now that
+# dates are ISO-8601. Market-wide queries (date ranges across all issuers, paging through
+# them by (Date, Symbol)) go through the date-leading index below.
+STOCK_DATA_INDEXES = [
+    # Superseded by DailyMarketSummary for the top-by-volume lookup
+    'DROP INDEX IF EXISTS idx_stockdata_date_volume',
+    'CREATE INDEX IF NOT EXISTS idx_stockdata_date_symbol ON StockData (Date, Symbol)',
+    'CREATE INDEX IF NOT EXISTS idx_market_summary_date_volume ON DailyMarketSummary (Date, Volume)',
+    'CREATE INDEX IF NOT EXISTS idx_stock_data_archive_year ON StockDataArchive (Year)',
+]
+
+ALL_INFO_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_all_info_issuer_recommendation ON all_info (issuer, recommendation)',
+]
+
+# Per-issuer totals of the sentiment rows in all_info, updated in the same transaction as
+# each all_info insert so the fundamental service doesn't have to count them
+RECOMMENDATION_COUNTS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS RecommendationCounts (
+    issuer TEXT PRIMARY KEY,
+    buy INTEGER NOT NULL DEFAULT 0,
+    sell INTEGER NOT NULL DEFAULT 0,
+    hold INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+UPDATE_RECOMMENDATION_COUNTS_QUERY = '''
+INSERT INTO RecommendationCounts (issuer, buy, sell, hold)
+VALUES (:issuer, :recommendation = 'buy', :recommendation = 'sell', :recommendation = 'hold')
+ON CONFLICT (issuer) DO UPDATE SET
+    buy = buy + excluded.buy,
+    sell = sell + excluded.sell,
+    hold = hold + excluded.hold
+'''
+
+FETCH_SYMBOLS_QUERY = "SELECT Symbol FROM StockData UNION SELECT Symbol FROM StockDataArchive"
+
+# The *_LIVE_* forms are for databases and read snapshots without StockDataArchive
+FETCH_LIVE_SYMBOLS_QUERY = "SELECT DISTINCT Symbol FROM StockData"
+
+FETCH_ISSUERS_QUERY = "SELECT DISTINCT issuer FROM recommendations"
+
+LAST_SAVED_DATE_QUERY = "SELECT LastDate FROM SymbolTracking WHERE Symbol = ?"
+
+UPDATE_LAST_DATE_QUERY = "UPDATE SymbolTracking SET LastDate = ? WHERE Symbol = ?"
+
+LATEST_DATE_QUERY = "SELECT MAX(Date) FROM DailyMarketSummary"
+
+# Counts archived rows too, so compacting a symbol doesn't make its snapshots look stale
+SYMBOL_WATERMARK_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM StockData WHERE Symbol = :symbol)
+        + (SELECT COALESCE(SUM(Rows), 0) FROM StockDataArchive WHERE Symbol = :symbol),
+    COALESCE((SELECT MAX(Date) FROM StockData WHERE Symbol = :symbol),
+             (SELECT MAX(LastDate) FROM StockDataArchive WHERE Symbol = :symbol))
+"""
+
+SYMBOL_LIVE_WATERMARK_QUERY = "SELECT COUNT(*), MAX(Date) FROM StockData WHERE Symbol = :symbol"
+
+# {source} is StockData, or the stitched live + archived rows from _stock_data_source
+SYMBOL_HISTORY_QUERY = """
+SELECT history.Date, history.LastTradePrice, history.Max, history.Min, history.Volume,
+       returns.Close, returns.PriceChange, returns.DailyReturn, returns.LogReturn, returns.TrueRange
+FROM {source} AS history
+LEFT JOIN StockReturns AS returns ON returns.Symbol = history.Symbol AND returns.Date = history.Date
+WHERE history.Symbol = ?
+ORDER BY history.Date ASC
+"""
+
+SYMBOL_HISTORY_COLUMNS = ['Date', 'LastTradePrice', 'Max', 'Min', 'Volume',
+                          'Close', 'PriceChange', 'DailyReturn', 'LogReturn', 'TrueRange']
+
+PREVIOUS_CLOSE_QUERY = """
+SELECT Close, CumLogReturn, Position FROM StockReturns
+WHERE Symbol = ? AND Date < ?
+ORDER BY Date DESC
+LIMIT 1
+"""
+
+INSERT_RETURNS_QUERY = """
+INSERT OR REPLACE INTO StockReturns (
+    Symbol, Date, Close, PriceChange, DailyReturn, LogReturn, TrueRange, Volume, CumLogReturn, Position
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+LAST_CLOSE_QUERY = """
+SELECT Close FROM StockReturns
+WHERE Symbol = ? AND Date <= ?
+ORDER BY Date DESC
+LIMIT 1
+"""
+
+INSERT_RANGE_INDEX_QUERY = """
+INSERT OR REPLACE INTO StockRangeIndex (Symbol, Level, Position, High, Low) VALUES (?, ?, ?, ?, ?)
+"""
+
+RANGE_INDEX_LEVEL_QUERY = """
+SELECT High, Low FROM StockRangeIndex
+WHERE Symbol = ? AND Level = ? AND Position BETWEEN ? AND ?
+ORDER BY Position
+"""
+
+# First and last trading day positions of a symbol within [:from_date, :to_date]
+RANGE_POSITIONS_QUERY = """
+SELECT
+    (SELECT Position FROM StockReturns
+     WHERE Symbol = :symbol AND Date >= :from_date
+     ORDER BY Date ASC LIMIT 1),
+    (SELECT Position FROM StockReturns
+     WHERE Symbol = :symbol AND Date <= :to_date
+     ORDER BY Date DESC LIMIT 1)
+"""
+
+RANGE_EXTREMES_QUERY = """
+SELECT MAX(High), MIN(Low) FROM StockRangeIndex
+WHERE Symbol = ? AND Level = ? AND Position IN (?, ?)
+"""
+
+# Log return of every symbol between its last closes on or before :from_date and :to_date,
+# read off the CumLogReturn prefix sums with two index seeks per symbol. LogReturn is NULL
+# for symbols without a close by :from_date (filtering on it in SQL would run the seeks twice).
+RANGE_RETURNS_QUERY = """
+SELECT tracking.Symbol,
+       (SELECT CumLogReturn FROM StockReturns
+        WHERE Symbol = tracking.Symbol AND Date <= :to_date
+        ORDER BY Date DESC LIMIT 1)
+     - (SELECT CumLogReturn FROM StockReturns
+        WHERE Symbol = tracking.Symbol AND Date <= :from_date
+        ORDER BY Date DESC LIMIT 1) AS LogReturn
+FROM SymbolTracking AS tracking
+"""
+
+ARCHIVE_BLOCKS_QUERY = "SELECT Symbol, Year, Block FROM StockDataArchive WHERE Year BETWEEN ? AND ?"
+
+ARCHIVE_SYMBOL_BLOCKS_QUERY = ARCHIVE_BLOCKS_QUERY + " AND Symbol = ?"
+
+# Blocks of a symbol whose date range overlaps [from_date, to_date]
+ARCHIVE_OVERLAP_QUERY = """
+SELECT Year, Block FROM StockDataArchive
+WHERE Symbol = :symbol AND Year BETWEEN :from_year AND :to_year
+  AND LastDate >= :from_date AND FirstDate <= :to_date
+"""
+
+TOP_10_QUERY = """
+SELECT 
+    Symbol, 
+    AvgPrice,
+    PercentageChange,
+    Volume AS DailyTotalVolume,
+    TotalTurnover
+FROM DailyMarketSummary
+WHERE Date = ?
+ORDER BY DailyTotalVolume DESC
+LIMIT 10
+"""
+
+TRADING_DAYS_QUERY = "SELECT Date FROM TradingDays WHERE Date BETWEEN ? AND ? ORDER BY Date"
+
+INSERT_TRADING_DAYS_QUERY = "INSERT OR IGNORE INTO TradingDays (Date) VALUES (?)"
+
+LAST_TRADE_DATE_QUERY = """
+SELECT COALESCE((SELECT MAX(Date) FROM StockData WHERE Symbol = :symbol),
+                (SELECT MAX(LastDate) FROM StockDataArchive WHERE Symbol = :symbol))
+"""
+
+LAST_LIVE_TRADE_DATE_QUERY = "SELECT MAX(Date) FROM StockData WHERE Symbol = :symbol"
+
+FETCH_CHECKPOINTS_QUERY = "SELECT FromDate, ToDate FROM FetchCheckpoints WHERE Symbol = ? ORDER BY FromDate"
+
+INSERT_FETCH_CHECKPOINT_QUERY = "INSERT OR REPLACE INTO FetchCheckpoints (Symbol, FromDate, ToDate) VALUES (?, ?, ?)"
+
+DELETE_FETCH_CHECKPOINTS_QUERY = "DELETE FROM FetchCheckpoints WHERE Symbol = ? AND ToDate <= ?"
+
+RECOMMENDATION_COUNTS_QUERY = "SELECT buy, sell, hold FROM RecommendationCounts WHERE issuer = ?"
+
+ALL_RECOMMENDATION_COUNTS_QUERY = "SELECT issuer, buy, sell, hold FROM RecommendationCounts ORDER BY issuer"
+
+class QueryStats:
+    """
+    Per-query timing collected from every statement run through the pool.
+
+    Each query is named after the function that issued it (e.g. "DB.retrieve_top_10").
+    The last WINDOW durations per name feed a rolling histogram, and statements slower
+    than slow_query_ms are written to the slow-query log.
+    """
+    WINDOW = 1000
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+    def __init__(self, slow_query_ms, log_path):
+        self.slow_query_ms = slow_query_ms
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=self.WINDOW))
+        self._calls = defaultdict(int)
+        self._rows = defaultdict(int)
+        self._recent_slow = deque(maxlen=50)
+        self._slow_log = None
+
+    def _get_slow_log(self):
+        if self._slow_log is None:
+            logger = logging.getLogger('slow_query')
+            if not logger.handlers:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                handler = logging.FileHandler(self.log_path)
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                logger.addHandler(handler)
+            self._slow_log = logger
+        return self._slow_log
+
+    def record(self, name, sql, params, duration, rows):
+        duration_ms = duration * 1000
+        with self._lock:
+            self._durations[name].append(duration_ms)
+            self._calls[name] += 1
+            self._rows[name] += rows
+            if duration_ms < self.slow_query_ms:
+                return
+            entry = {
+                "query": name,
+                "duration_ms": round(duration_ms, 3),
+                "rows": rows,
+                "params": _describe_params(params),
+                "sql": " ".join(sql.split()),
+            }
+            self._recent_slow.append(entry)
+        self._get_slow_log().warning(
+            "%s took %.1f ms (%d rows) params=%s sql=%s",
+            name, duration_ms, rows, entry["params"], entry["sql"]
+        )
+
+    def snapshot(self):
+        """Returns the histograms and recent slow queries as plain data (for JSON)."""
+        with self._lock:
+            queries = {}
+            for name, durations in self._durations.items():
+                ordered = sorted(durations)
+                histogram = {f"<={bound}ms": 0 for bound in self.BUCKETS_MS}
+                histogram[f">{self.BUCKETS_MS[-1]}ms"] = 0
+                for value in ordered:
+                    bucket = next((f"<={bound}ms" for bound in self.BUCKETS_MS if value <= bound),
+                                  f">{self.BUCKETS_MS[-1]}ms")
+                    histogram[bucket] += 1
+                queries[name] = {
+                    "calls": self._calls[name],
+                    "rows": self._rows[name],
+                    "mean_ms": round(sum(ordered) / len(ordered), 3),
+                    "p50_ms": round(_percentile(ordered, 50), 3),
+                    "p95_ms": round(_percentile(ordered, 95), 3),
+                    "p99_ms": round(_percentile(ordered, 99), 3),
+                    "max_ms": round(ordered[-1], 3),
+                    "histogram": histogram,
+                }
+            return {
+                "slow_query_ms": self.slow_query_ms,
+                "queries": queries,
+                "recent_slow_queries": list(self._recent_slow),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._calls.clear()
+            self._rows.clear()
+            self._recent_slow.clear()
+
+
+def _percentile(ordered, percent):
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _describe_params(params):
+    text = repr(params)
+    return text if len(text) <= 200 else text[:197] + '...'
+
+
+QUERY_STATS = QueryStats(
+    slow_query_ms=float(os.environ.get('SLOW_QUERY_MS', 100)),
+    log_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'slow_queries.log')
+)
+
+# Frames from the standard library and installed packages (e.g. pandas.read_sql) are
+# skipped when naming a query, so it is attributed to our own calling function
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()['stdlib'], sysconfig.get_paths()['purelib']})
+
+
+def _caller_name():
+    frame = sys._getframe(3)  # Skip this helper, _TimedCursor._start and the cursor method
+    while frame is not None and frame.f_code.co_filename.startswith(_LIBRARY_PATHS):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's duration and row count to QUERY_STATS."""
+    _pending = None  # [name, sql, params, seconds, rows] of the statement being read
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            name, sql, params, duration, rows = pending
+            # rowcount covers INSERT/UPDATE/DELETE, fetched rows cover SELECT
+            QUERY_STATS.record(name, sql, params, duration, max(rows, self.rowcount))
+
+    def _start(self, sql, params, started):
+        self._pending = [_caller_name(), sql, params, time.perf_counter() - started, 0]
+
+    def _fetched(self, rows, started, exhausted):
+        if self._pending:
+            self._pending[3] += time.perf_counter() - started
+            self._pending[4] += rows
+            if exhausted:
+                self._flush()
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._start(sql, "<many>", started)
+            self._flush()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(0 if row is None else 1, started, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), started, not rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started, True)
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers when the pool last verified it."""
+    last_checked = 0.0
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
 
 class DatabaseConnection:
+    """
+    Singleton pool of SQLite connections.
+
+    Every thread gets its own connection from get_connection(), so concurrent Flask
+    requests no longer share one handle. Connections are returned to a small idle pool
+    with release_connection() (called on request teardown) and reused by the next
+    thread. The database runs in WAL mode, so readers are not blocked by the scraper.
+    """
     _instance = None
+    _instance_lock = threading.Lock()
+
+    MAX_IDLE_CONNECTIONS = 8
+    HEALTH_CHECK_INTERVAL = 60  # seconds between liveness checks of a connection
+    BUSY_TIMEOUT = 30  # seconds a writer waits for the lock before failing
+    PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",  # Durable enough with WAL, far fewer fsyncs
+        "PRAGMA cache_size = -16000",  # 16 MB page cache per connection
+        "PRAGMA mmap_size = 268435456",  # Memory-map up to 256 MB of the file
+        "PRAGMA temp_store = MEMORY",
+    )
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(DatabaseConnection, cls).__new__(cls, *args, **kwargs)
-            cls._instance._initialize_connection()
+            with cls._instance_lock:
+                if not cls._instance:
+                    instance = super(DatabaseConnection, cls).__new__(cls, *args, **kwargs)
+                    instance._initialize_pool()
+                    cls._instance = instance
         return cls._instance
 
-    def _initialize_connection(self):
-        """Initialize the database connection."""
+    def _initialize_pool(self):
+        """Initialize the pool and switch the database file to WAL mode."""
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = os.path.join(base_dir, 'data', 'stock_data.db')
-        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        # STOCK_DATA_DB points the app at another database file (benchmarks use a scratch copy)
+        self.db_path = os.environ.get('STOCK_DATA_DB') or os.path.join(base_dir, 'data', 'stock_data.db')
+        self._local = threading.local()
+        self._idle = []
+        self._pool_lock = threading.Lock()
 
-    def get_connection(self):
-        """Get the database connection, reopening it if necessary."""
+        # journal_mode is persistent, so setting it once per process is enough
+        connection = self._create_connection()
+        connection.execute("PRAGMA journal_mode = WAL")
+        self._local.connection = connection
+
+    def _create_connection(self):
+        # Connections move between threads only through the pool, never concurrently
+        connection = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT,
+            check_same_thread=False,
+            factory=_PooledConnection
+        )
+        for pragma in self.PRAGMAS:
+            connection.execute(pragma)
+        connection.last_checked = time.monotonic()
+        return connection
+
+    def _is_healthy(self, connection):
+        """Run the liveness check only if the connection hasn't been verified recently."""
+        now = time.monotonic()
+        if now - connection.last_checked < self.HEALTH_CHECK_INTERVAL:
+            return True
         try:
-            # Test the connection with a simple query
-            self.connection.execute("SELECT 1")
+            connection.execute("SELECT 1")
         except (sqlite3.ProgrammingError, sqlite3.OperationalError):
+            return False
+        connection.last_checked = now
+        return True
+
+    def _acquire(self):
+        with self._pool_lock:
+            while self._idle:
+                connection = self._idle.pop()
+                if self._is_healthy(connection):
+                    return connection
+                print("Discarding broken pooled database connection...")
+        return self._create_connection()
+
+    def get_connection(self):
+        """Get the calling thread's connection, taking one from the pool if needed."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and not self._is_healthy(connection):
             print("Reopening closed database connection...")
-            self._initialize_connection()  # Reinitialize the connection
-        return self.connection
+            connection = None
+        if connection is None:
+            connection = self._acquire()
+            self._local.connection = connection
+        return connection
+
+    def get_read_connection(self):
+        """
+        Get a connection to the latest published read snapshot (see publish_read_snapshot).
+
+        Analytics reads go here so they never wait on ingest locks. The snapshot is opened
+        as immutable, and a thread moves to a newer snapshot on its next call after one is
+        published. Falls back to the live database if nothing has been published yet.
+        """
+        path = current_read_snapshot()
+        if path is None:
+            return self.get_connection()
+        if getattr(self._local, 'read_path', None) != path:
+            self._close_read_connection()
+            self._local.read_connection = sqlite3.connect(
+                f"{Path(path).as_uri()}?immutable=1",
+                uri=True,
+                check_same_thread=False,
+                factory=_PooledConnection
+            )
+            self._local.read_path = path
+        return self._local.read_connection
+
+    def _close_read_connection(self):
+        connection = getattr(self._local, 'read_connection', None)
+        self._local.read_connection = None
+        self._local.read_path = None
+        if connection is not None:
+            connection.close()
+
+    def release_connection(self):
+        """Return the calling thread's connection to the pool."""
+        self._close_read_connection()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            return
+        self._local.connection = None
+        try:
+            if connection.in_transaction:
+                connection.rollback()  # Never hand out a connection mid-transaction
+        except sqlite3.ProgrammingError:
+            return  # Already closed
+        with self._pool_lock:
+            if len(self._idle) < self.MAX_IDLE_CONNECTIONS:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def query_stats(self):
+        """Timing histograms and slow queries for every statement run through the pool."""
+        return QUERY_STATS.snapshot()
 
     def close_connection(self):
-        """Close the database connection."""
-        if hasattr(self, 'connection'):
-            self.connection.close()
-            self.connection = None
+        """Close the calling thread's connection and every idle pooled connection."""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle + ([connection] if connection is not None else []):
+            pooled.close()
+
+# Read-only copies of the database, published after each ingest cycle
+READ_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'read_snapshots')
+# Holds the file name of the current snapshot; replaced atomically to switch readers
+READ_SNAPSHOT_POINTER = os.path.join(READ_SNAPSHOT_DIR, 'CURRENT')
+
+_pointer_cache = (None, None)  # ((inode, mtime) of the pointer file, snapshot path)
+
+
+def current_read_snapshot():
+    """Returns the path of the latest published read snapshot, or None."""
+    global _pointer_cache
+    try:
+        stat = os.stat(READ_SNAPSHOT_POINTER)
+    except OSError:
+        return None
+    # The pointer is replaced, never rewritten, so a new inode means a new snapshot
+    version = (stat.st_ino, stat.st_mtime_ns)
+    cached_version, path = _pointer_cache
+    if version != cached_version:
+        with open(READ_SNAPSHOT_POINTER, 'r') as file:
+            name = file.read().strip()
+        path = os.path.join(READ_SNAPSHOT_DIR, name) if name else None
+        _pointer_cache = (version, path)
+    return path
+
+
+def publish_read_snapshot(keep=2):
+    """
+    Publishes a consistent read-only copy of the database for the analytics services.
+
+    The copy is taken with SQLite's online backup API in a single step: in WAL mode it
+    only holds a read transaction, so the scraper keeps writing meanwhile, whereas a
+    stepped copy restarts whenever another connection writes and may never finish while
+    an ingest is running. The new file is then made current by atomically replacing the
+    pointer file. Readers already using the previous snapshot keep it until they
+    reconnect, so only the `keep` newest snapshots are retained.
+    """
+    os.makedirs(READ_SNAPSHOT_DIR, exist_ok=True)
+    name = f"stock_data.{time.time_ns()}.db"
+    path = os.path.join(READ_SNAPSHOT_DIR, name)
+
+    target = sqlite3.connect(f"{path}.tmp")
+    try:
+        DatabaseConnection().get_connection().backup(target)
+        # Standalone file without -wal/-shm companions, so it can be opened immutable
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    os.replace(f"{path}.tmp", path)
+
+    with open(f"{READ_SNAPSHOT_POINTER}.tmp", 'w') as file:
+        file.write(name)
+    os.replace(f"{READ_SNAPSHOT_POINTER}.tmp", READ_SNAPSHOT_POINTER)
+
+    _prune_read_snapshots(keep)
+    return path
+
+
+def _prune_read_snapshots(keep):
+    snapshots = sorted(
+        (name for name in os.listdir(READ_SNAPSHOT_DIR) if name.startswith('stock_data.') and name.endswith('.db')),
+        key=lambda name: int(name.split('.')[1])
+    )
+    for name in snapshots[:-keep]:
+        try:
+            os.remove(os.path.join(READ_SNAPSHOT_DIR, name))
+        except OSError:
+            pass  # Still open somewhere (Windows), retried on the next publish
+
 
 def test_database_connection():
     """Check if the database connection is successful at startup."""
@@ -58,23 +736,35 @@ def init_createDB():
         )
         ''')
 
-        # Main table for storing detailed stock data
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS StockData (
-            Symbol TEXT,
-            Date TEXT,
-            LastTradePrice REAL,
-            Max REAL,
-            Min REAL,
-            AvgPrice REAL,
-            PercentageChange REAL,
-            Volume TEXT,
-            TurnoverInBEST TEXT,
-            TotalTurnover TEXT,
-            PRIMARY KEY (Symbol, Date),
-            FOREIGN KEY (Symbol) REFERENCES SymbolTracking(Symbol)
-        )
-        ''')
+        # Main table for storing detailed stock data (ISO dates, numeric columns)
+        cursor.execute(STOCK_DATA_TABLE_SQL.format(table='StockData'))
+
+        # Latest trading day per symbol, shown on the dashboard
+        cursor.execute(MARKET_SUMMARY_TABLE_SQL)
+
+        # Compressed closed years, filled by compact_history
+        cursor.execute(STOCK_DATA_ARCHIVE_TABLE_SQL)
+
+        # Derived per-day returns, kept up to date by insert_stock_data
+        cursor.execute(STOCK_RETURNS_TABLE_SQL)
+        for column, column_type in STOCK_RETURNS_ADDED_COLUMNS:
+            cursor.execute("SELECT 1 FROM pragma_table_info('StockReturns') WHERE name = ?", (column,))
+            if cursor.fetchone() is None:
+                # Created by an older version; emptied so rebuild_returns refills it
+                cursor.execute(f'ALTER TABLE StockReturns ADD COLUMN {column} {column_type}')
+                cursor.execute('DELETE FROM StockReturns')
+
+        # Range high/low sparse table, maintained together with StockReturns
+        cursor.execute(STOCK_RANGE_INDEX_TABLE_SQL)
+
+        # Observed trading days, used by the fetch planner's calendar
+        cursor.execute(TRADING_DAYS_TABLE_SQL)
+
+        # Windows stored ahead of their symbol's watermark, used to resume a refresh
+        cursor.execute(FETCH_CHECKPOINTS_TABLE_SQL)
+
+        # Per-issuer sentiment counts, filled from all_info once the fundamental scraper ran
+        cursor.execute(RECOMMENDATION_COUNTS_TABLE_SQL)
 
         # Insert initial symbols from the CSV file into SymbolTracking
         with open(os.path.join("../", 'symbols.csv'), 'r') as file:
@@ -88,51 +778,541 @@ def init_createDB():
     finally:
         cursor.close()
 
+    # Databases created before the typed schema still hold text dates/numbers
+    migrate_stock_data()
+    create_indexes()
+    rebuild_market_summary(only_if_empty=True)
+    rebuild_returns(only_if_empty=True)
+    rebuild_recommendation_counts(only_if_empty=True)
+    rebuild_trading_days(only_if_empty=True)
+
+
+def create_indexes():
+    """Creates the secondary indexes used by the DB.py and service queries."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        for statement in STOCK_DATA_INDEXES:
+            cursor.execute(statement)
+        # all_info is created by the fundamental analysis scraper
+        if _table_exists(cursor, 'all_info'):
+            for statement in ALL_INFO_INDEXES:
+                cursor.execute(statement)
+        db.commit()
+    finally:
+        cursor.close()
+
+
+def rebuild_recommendation_counts(only_if_empty=False):
+    """Recounts RecommendationCounts from all_info (created by the fundamental scraper)."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        if not _table_exists(cursor, 'all_info'):
+            return
+        cursor.execute(RECOMMENDATION_COUNTS_TABLE_SQL)
+        if only_if_empty:
+            cursor.execute('SELECT 1 FROM RecommendationCounts LIMIT 1')
+            if cursor.fetchone():
+                db.commit()
+                return
+        cursor.execute('DELETE FROM RecommendationCounts')
+        cursor.execute('''
+        INSERT INTO RecommendationCounts (issuer, buy, sell, hold)
+        SELECT issuer,
+               SUM(recommendation = 'buy'),
+               SUM(recommendation = 'sell'),
+               SUM(recommendation = 'hold')
+        FROM all_info
+        WHERE recommendation IS NOT NULL
+        GROUP BY issuer
+        ''')
+        db.commit()
+    finally:
+        cursor.close()
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _archive_query(cursor, query, live_query):
+    """Returns query, or live_query when the database has no StockDataArchive to read."""
+    return query if _table_exists(cursor, 'StockDataArchive') else live_query
+
+
+def parse_stored_number(value):
+    """Parses a number stored by the old writer ('1.234,56') into a float."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return float(value.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+# How far volume x average price may be from the BEST turnover for a volume reading to fit
+VOLUME_TURNOVER_TOLERANCE = 0.01
+
+
+def parse_stored_volume(value, avg_price=None, turnover=None):
+    """
+    Parses a Volume stored by the old writer into an integer.
+
+    The legacy column has INTEGER affinity, so SQLite turned thousand-separated strings
+    into numbers: '1.167' became the REAL 1.167 and '1.000' the INTEGER 1. REALs always
+    stand for thousands; an INTEGER is taken as thousands only when that, and not the
+    value as stored, matches the day's average price and BEST turnover.
+    """
+    if isinstance(value, float):
+        return round(value * 1000)
+    volume = parse_stored_number(value)
+    if volume is None:
+        return None
+    volume = int(volume)
+    if isinstance(value, int) and avg_price and turnover:
+        def fits(candidate):
+            return abs(avg_price * candidate - turnover) <= VOLUME_TURNOVER_TOLERANCE * turnover
+        if fits(volume * 1000) and not fits(volume):
+            return volume * 1000
+    return volume
+
+
+def to_iso_date(value):
+    """Converts an MM/DD/YYYY date (as used by mse.mk) to YYYY-MM-DD."""
+    try:
+        return datetime.strptime(value, '%m/%d/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return value  # Already ISO (or unparseable), keep as is
+
+
+def _typed_stock_row(row):
+    """Converts one legacy StockData row to the typed column layout."""
+    avg_price = parse_stored_number(row[5])
+    turnover = parse_stored_number(row[8])
+    return (
+        row[0],
+        to_iso_date(row[1]),
+        parse_stored_number(row[2]),
+        parse_stored_number(row[3]),
+        parse_stored_number(row[4]),
+        avg_price,
+        parse_stored_number(row[6]),
+        parse_stored_volume(row[7], avg_price, turnover),
+        turnover,
+        parse_stored_number(row[9]),
+    )
+
+
+def _copy_stock_batches(cursor, last_rowid, batch_size, commit=None):
+    """Copies StockData rows after last_rowid into StockData_typed, batch by batch."""
+    copied = 0
+    while True:
+        cursor.execute('''
+        SELECT rowid, Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
+               Volume, TurnoverInBEST, TotalTurnover
+        FROM StockData
+        WHERE rowid > ?
+        ORDER BY rowid
+        LIMIT ?
+        ''', (last_rowid, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return last_rowid, copied
+        cursor.executemany('''
+        INSERT OR IGNORE INTO StockData_typed (
+            Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
+            Volume, TurnoverInBEST, TotalTurnover
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [_typed_stock_row(row[1:]) for row in rows])
+        if commit:
+            commit()
+        last_rowid = rows[-1][0]
+        copied += len(rows)
+
+
+def migrate_stock_data(batch_size=5000):
+    """
+    Rewrites StockData into ISO-8601 dates and REAL/INTEGER columns.
+
+    Rows are copied into a shadow table in batches, each committed on its own so the
+    scraper can keep writing in between. Rows that arrive during the copy are picked
+    up by a final catch-up pass that runs together with the table swap under a single
+    write lock. Safe to call repeatedly; returns the number of migrated rows.
+    """
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute('PRAGMA user_version')
+        if cursor.fetchone()[0] >= STOCK_DATA_SCHEMA_VERSION:
+            return 0
+
+        cursor.execute(STOCK_DATA_TABLE_SQL.format(table='StockData_typed'))
+        db.commit()
+
+        last_rowid, migrated = _copy_stock_batches(cursor, 0, batch_size, commit=db.commit)
+
+        # Catch up on rows inserted meanwhile and swap the tables atomically
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            _, caught_up = _copy_stock_batches(cursor, last_rowid, batch_size)
+            cursor.execute('DROP TABLE StockData')
+            cursor.execute('ALTER TABLE StockData_typed RENAME TO StockData')
+            cursor.execute(f'PRAGMA user_version = {STOCK_DATA_SCHEMA_VERSION}')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        migrated += caught_up
+        print(f"Migrated {migrated} StockData rows to the typed schema.")
+        return migrated
+    finally:
+        cursor.close()
+
 
 # Update the last date scraped for a given symbol
 def update_last_date(symbol, last_date):
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
-        cursor.execute('''
-        UPDATE SymbolTracking
-        SET LastDate = ?
-        WHERE Symbol = ?
-        ''', (last_date, symbol))
+        cursor.execute(UPDATE_LAST_DATE_QUERY, (last_date, symbol))
         db.commit()
     finally:
         cursor.close()
 
 
+INSERT_STOCK_DATA_QUERY = '''
+INSERT OR IGNORE INTO StockData (
+    Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
+    Volume, TurnoverInBEST, TotalTurnover
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Rows handed to a single executemany call by bulk_ingest
+DEFAULT_INGEST_BATCH_SIZE = 1000
+
+
+def _archived_dates(cursor, symbol, dates):
+    """The given ISO dates that are already stored in the symbol's archive blocks."""
+    if not dates:
+        return set()
+    from_date, to_date = min(dates), max(dates)
+    cursor.execute(ARCHIVE_OVERLAP_QUERY, {'symbol': symbol, 'from_year': int(from_date[:4]),
+                                           'to_year': int(to_date[:4]), 'from_date': from_date,
+                                           'to_date': to_date})
+    archived = set()
+    for year, block in cursor.fetchall():
+        archived.update(row[1] for row in _decode_block(symbol, year, block))
+    return archived & set(dates)
+
+
+def _insert_rows(cursor, symbol, data, batch_size=DEFAULT_INGEST_BATCH_SIZE):
+    """Inserts one symbol's rows in the caller's transaction; returns how many were new."""
+    # Rows of compacted years that are already archived count as duplicates, like live ones
+    archived = _archived_dates(cursor, symbol, [row[0] for row in data])
+    # Prepare data in the format needed for executemany
+    bulk_data = [
+        (symbol, row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
+        for row in data if row[0] not in archived
+    ]
+    inserted = 0
+    for start in range(0, len(bulk_data), batch_size):
+        cursor.executemany(INSERT_STOCK_DATA_QUERY, bulk_data[start:start + batch_size])
+        inserted += cursor.rowcount  # Rows ignored as duplicates don't count
+    _update_market_summary(cursor, bulk_data)
+    if inserted:
+        _update_returns(cursor, symbol, min(row[1] for row in bulk_data))
+        cursor.executemany(INSERT_TRADING_DAYS_QUERY, [(day,) for day in {row[1] for row in bulk_data}])
+    return inserted
+
+
 # Insert stock data into StockData table
 def insert_stock_data(symbol, data):
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
-        # Prepare data in the format needed for executemany
-        bulk_data = [
-            (symbol, row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8])
-            for row in data
-        ]
+        _insert_rows(cursor, symbol, data)
+        db.commit()
+    finally:
+        cursor.close()
+    bump_data_generation()
 
-        cursor.executemany('''
-               INSERT OR IGNORE INTO StockData (
-                   Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
-                   Volume, TurnoverInBEST, TotalTurnover
-               ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-           ''', bulk_data)
+
+def bulk_ingest(issuer_data, batch_size=DEFAULT_INGEST_BATCH_SIZE, checkpoints=()):
+    """
+    Writes rows for many issuers, and their SymbolTracking watermarks, in one transaction.
+
+    issuer_data is an iterable of (symbol, rows, last_date) tuples, with rows in the
+    layout insert_stock_data expects; a last_date of None leaves the watermark as it is.
+    checkpoints are (symbol, from_date, to_date) windows to record as stored in the same
+    transaction, and a moved watermark drops the checkpoints it has passed. Either
+    everything is committed or nothing is. Returns a dict with the number of rows
+    inserted and skipped as duplicates.
+    """
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    inserted = skipped = 0
+    try:
+        cursor.executemany(INSERT_FETCH_CHECKPOINT_QUERY, [
+            (symbol, to_iso_date(from_date), to_iso_date(to_date)) for symbol, from_date, to_date in checkpoints
+        ])
+        for symbol, data, last_date in issuer_data:
+            new_rows = _insert_rows(cursor, symbol, data, batch_size)
+            inserted += new_rows
+            skipped += len(data) - new_rows
+            if last_date is not None:
+                cursor.execute(UPDATE_LAST_DATE_QUERY, (last_date, symbol))
+                cursor.execute(DELETE_FETCH_CHECKPOINTS_QUERY, (symbol, to_iso_date(last_date)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    bump_data_generation()
+    return {"inserted": inserted, "skipped": skipped}
+
+
+def _update_market_summary(cursor, bulk_data):
+    """Folds newly inserted rows into DailyMarketSummary, in the caller's transaction."""
+    if not bulk_data:
+        return
+    new_date = max(row[1] for row in bulk_data)
+    cursor.execute(LATEST_DATE_QUERY)
+    latest_date = cursor.fetchone()[0]
+    if latest_date and new_date < latest_date:
+        return  # Backfill of older days, the dashboard only shows the latest one
+
+    cursor.executemany('''
+    INSERT OR REPLACE INTO DailyMarketSummary (
+        Date, Symbol, AvgPrice, PercentageChange, Volume, TotalTurnover
+    ) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(row[1], row[0], row[5], row[6], row[7], row[9]) for row in bulk_data if row[1] == new_date])
+    if latest_date is None or new_date > latest_date:
+        cursor.execute('DELETE FROM DailyMarketSummary WHERE Date < ?', (new_date,))
+
+
+def rebuild_market_summary(only_if_empty=False):
+    """Recomputes DailyMarketSummary from the latest trading day in StockData."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        if only_if_empty:
+            cursor.execute('SELECT 1 FROM DailyMarketSummary LIMIT 1')
+            if cursor.fetchone():
+                return
+        cursor.execute('DELETE FROM DailyMarketSummary')
+        cursor.execute('''
+        INSERT INTO DailyMarketSummary (Date, Symbol, AvgPrice, PercentageChange, Volume, TotalTurnover)
+        SELECT Date, Symbol, AvgPrice, PercentageChange, Volume, TotalTurnover
+        FROM StockData
+        WHERE Date = (SELECT MAX(Date) FROM StockData)
+        ''')
+        db.commit()
+    finally:
+        cursor.close()
+
+
+def derive_returns(history, previous_close=None, previous_cumulative=0.0):
+    """
+    Computes the derived per-day fields of a symbol's history.
+
+    history holds (Date, LastTradePrice, Max, Min, Volume) rows in date order;
+    previous_close and previous_cumulative describe the day before the first one, if any.
+    Yields (Date, Close, PriceChange, DailyReturn, LogReturn, TrueRange, Volume,
+    CumLogReturn) rows. Days without a trade keep the last close; fields that need the
+    previous close are NULL on the symbol's first day. CumLogReturn is the running sum
+    of LogReturn (0 on the first day), so the return between two days is
+    exp(CumLogReturn[b] - CumLogReturn[a]) - 1.
+    """
+    for day, price, high, low, volume in history:
+        close = price if price else previous_close
+        change = daily_return = log_return = true_range = None
+        if close and previous_close:
+            change = close - previous_close
+            daily_return = close / previous_close - 1
+            log_return = math.log(close / previous_close)
+        high = high if high else close
+        low = low if low else close
+        if high is not None and low is not None:
+            if previous_close:
+                true_range = max(high, previous_close) - min(low, previous_close)
+            else:
+                true_range = high - low
+        previous_cumulative += log_return or 0.0
+        yield day, close, change, daily_return, log_return, true_range, volume, previous_cumulative
+        previous_close = close
+
+
+def _update_returns(cursor, symbol, from_date):
+    """
+    Recomputes a symbol's StockReturns and StockRangeIndex from from_date on, in the
+    caller's transaction. Appending new days only touches the new positions.
+    """
+    cursor.execute(PREVIOUS_CLOSE_QUERY, (symbol, from_date))
+    previous = cursor.fetchone()
+    first_position = previous[2] + 1 if previous else 0
+    source = _stock_data_source(cursor, from_date, None, symbol)
+    cursor.execute(f'''
+    SELECT Date, LastTradePrice, Max, Min, Volume
+    FROM {source}
+    WHERE Symbol = ? AND Date >= ?
+    ORDER BY Date ASC
+    ''', (symbol, from_date))
+    history = cursor.fetchall()
+    derived = list(derive_returns(history, *(previous[:2] if previous else ())))
+    cursor.executemany(INSERT_RETURNS_QUERY, [
+        (symbol, *row, first_position + offset) for offset, row in enumerate(derived)
+    ])
+    # Days without a trade count with their carried-forward close
+    _update_range_index(cursor, symbol, first_position, [
+        (high or row[1], low or row[1]) for (_, _, high, low, _), row in zip(history, derived)
+    ])
+
+
+def _higher(a, b):
+    return a if b is None else b if a is None else max(a, b)
+
+
+def _lower(a, b):
+    return a if b is None else b if a is None else min(a, b)
+
+
+def _update_range_index(cursor, symbol, first_position, extremes):
+    """
+    Writes the sparse-table entries that cover positions from first_position on.
+
+    extremes holds the (high, low) of every trading day from first_position to the
+    symbol's last one. Each level is built from two reads of the level below.
+    """
+    count = first_position + len(extremes)
+    cursor.executemany(INSERT_RANGE_INDEX_QUERY, [
+        (symbol, 0, first_position + offset, high, low) for offset, (high, low) in enumerate(extremes)
+    ])
+    level, width = 1, 2
+    while width <= count:
+        half = width // 2
+        start = max(0, first_position - width + 1)  # First entry whose window reaches the new days
+        end = count - width
+        cursor.execute(RANGE_INDEX_LEVEL_QUERY, (symbol, level - 1, start, end))
+        left = cursor.fetchall()
+        cursor.execute(RANGE_INDEX_LEVEL_QUERY, (symbol, level - 1, start + half, end + half))
+        right = cursor.fetchall()
+        cursor.executemany(INSERT_RANGE_INDEX_QUERY, [
+            (symbol, level, start + offset, _higher(a[0], b[0]), _lower(a[1], b[1]))
+            for offset, (a, b) in enumerate(zip(left, right))
+        ])
+        level, width = level + 1, width * 2
+
+
+def rebuild_returns(only_if_empty=False):
+    """Recomputes StockReturns and StockRangeIndex for every symbol from the full history."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        if only_if_empty:
+            cursor.execute('SELECT 1 FROM StockReturns LIMIT 1')
+            if cursor.fetchone():
+                return
+        cursor.execute('DELETE FROM StockReturns')
+        cursor.execute('DELETE FROM StockRangeIndex')
+        cursor.execute(_archive_query(cursor, FETCH_SYMBOLS_QUERY, FETCH_LIVE_SYMBOLS_QUERY))
+        for (symbol,) in cursor.fetchall():
+            _update_returns(cursor, symbol, '0000-01-01')
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def reset_stock_data():
+    """Empties StockData, its archive and derived tables, and clears every watermark."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        for table in ('StockData', 'StockDataArchive', 'StockReturns', 'StockRangeIndex', 'DailyMarketSummary',
+                      'TradingDays', 'FetchCheckpoints'):
+            cursor.execute(f'DELETE FROM {table}')
+        cursor.execute('UPDATE SymbolTracking SET LastDate = NULL')
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    bump_data_generation()
+
+
+def rebuild_trading_days(only_if_empty=False):
+    """Refills TradingDays with every date that has rows in StockData or its archive."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        if only_if_empty:
+            cursor.execute('SELECT 1 FROM TradingDays LIMIT 1')
+            if cursor.fetchone():
+                return
+        source = _stock_data_source(cursor)
+        cursor.execute('DELETE FROM TradingDays')
+        cursor.execute(f'INSERT INTO TradingDays (Date) SELECT DISTINCT Date FROM {source}')
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def trading_days(from_date, to_date):
+    """Returns the observed trading days between two ISO dates, in order."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(TRADING_DAYS_QUERY, (from_date, to_date))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def last_trade_dates(symbols):
+    """Maps each symbol to the ISO date of its latest row (live or archived), or None."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        query = _archive_query(cursor, LAST_TRADE_DATE_QUERY, LAST_LIVE_TRADE_DATE_QUERY)
+        last_dates = {}
+        for symbol in symbols:
+            cursor.execute(query, {'symbol': symbol})
+            last_dates[symbol] = cursor.fetchone()[0]
+        return last_dates
+    finally:
+        cursor.close()
+
+
+def fetch_checkpoints(symbols):
+    """Maps each symbol to its stored (from_date, to_date) windows (ISO dates), in order."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        checkpoints = {}
+        for symbol in symbols:
+            cursor.execute(FETCH_CHECKPOINTS_QUERY, (symbol,))
+            checkpoints[symbol] = cursor.fetchall()
+        return checkpoints
     finally:
         cursor.close()
 
 
 # Update or insert stock data and update the last date scraped for a given symbol
 def update_data(symbol, data, last_date):
-    # Insert or update stock data in the StockData table
-    insert_stock_data(symbol, data)
-
-    # Update the last date scraped for the symbol
-    update_last_date(symbol, last_date)
+    # Rows and watermark are committed together
+    return bulk_ingest([(symbol, data, last_date)])
 
 
 # Retrieve the last saved date for a symbol to resume scraping
@@ -140,9 +1320,7 @@ def get_last_saved_date(symbol):
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
-        cursor.execute('''
-        SELECT LastDate FROM SymbolTracking WHERE Symbol = ?
-        ''', (symbol,))
+        cursor.execute(LAST_SAVED_DATE_QUERY, (symbol,))
         result = cursor.fetchone()
         db.commit()
     finally:
@@ -181,81 +1359,326 @@ def view_stock_data():
     for row in stock_data:
         print(row)
 
+# Value columns of an archived block, in StockData order after (Symbol, Date)
+ARCHIVE_COLUMNS = ('LastTradePrice', 'Max', 'Min', 'AvgPrice', 'PercentageChange', 'Volume',
+                   'TurnoverInBEST', 'TotalTurnover')
+
+# Live rows overlapping archived ones (late backfills) win until the next compaction
+ARCHIVE_STITCHED_SOURCE = """(
+    SELECT * FROM StockData
+    UNION ALL
+    SELECT * FROM temp.StockDataCold AS cold
+    WHERE NOT EXISTS (
+        SELECT 1 FROM StockData AS live WHERE live.Symbol = cold.Symbol AND live.Date = cold.Date
+    )
+)"""
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _encode_block(year, rows):
+    """
+    Packs one symbol-year of (Date, *ARCHIVE_COLUMNS) rows into a compressed block.
+
+    Layout before compression: the row count, the dates as days since January 1st
+    (uint16) and then each value column as little-endian float64, NULLs stored as NaN.
+    """
+    start = date(year, 1, 1).toordinal()
+    parts = [
+        struct.pack('<I', len(rows)),
+        _little_endian(array('H', (date.fromisoformat(row[0]).toordinal() - start for row in rows))).tobytes(),
+    ]
+    for index in range(1, len(ARCHIVE_COLUMNS) + 1):
+        column = array('d', (float('nan') if row[index] is None else float(row[index]) for row in rows))
+        parts.append(_little_endian(column).tobytes())
+    return zlib.compress(b''.join(parts), 9)
+
+
+def _decode_block(symbol, year, block):
+    """Unpacks a block from _encode_block into StockData rows in date order."""
+    data = zlib.decompress(block)
+    (count,) = struct.unpack_from('<I', data)
+    offset = 4
+    days = array('H')
+    days.frombytes(data[offset:offset + 2 * count])
+    offset += 2 * count
+    columns = []
+    for _ in ARCHIVE_COLUMNS:
+        column = array('d')
+        column.frombytes(data[offset:offset + 8 * count])
+        offset += 8 * count
+        columns.append(_little_endian(column))
+    _little_endian(days)
+
+    volume_index = ARCHIVE_COLUMNS.index('Volume')
+    start = date(year, 1, 1).toordinal()
+    rows = []
+    for i in range(count):
+        values = [None if column[i] != column[i] else column[i] for column in columns]  # NaN -> NULL
+        if values[volume_index] is not None:
+            values[volume_index] = int(values[volume_index])
+        rows.append((symbol, date.fromordinal(start + days[i]).isoformat(), *values))
+    return rows
+
+
+def _stock_data_source(cursor, from_date=None, to_date=None, symbol=None):
+    """
+    Returns the FROM clause to read StockData between from_date and to_date with.
+
+    When archived blocks overlap the range they are decoded into a temporary table and
+    the returned subquery unions them with the live rows; otherwise it is just StockData,
+    so queries over recent data pay nothing for the archive.
+    """
+    if not _table_exists(cursor, 'StockDataArchive'):
+        return "StockData"  # Read snapshot published before the archive existed
+    years = (int(from_date[:4]) if from_date else 0, int(to_date[:4]) if to_date else 9999)
+    if symbol:
+        cursor.execute(ARCHIVE_SYMBOL_BLOCKS_QUERY, (*years, symbol))
+    else:
+        cursor.execute(ARCHIVE_BLOCKS_QUERY, years)
+    blocks = cursor.fetchall()
+    if not blocks:
+        return "StockData"
+
+    cursor.execute('''
+    CREATE TEMP TABLE IF NOT EXISTS StockDataCold (
+        Symbol TEXT,
+        Date TEXT,
+        LastTradePrice REAL,
+        Max REAL,
+        Min REAL,
+        AvgPrice REAL,
+        PercentageChange REAL,
+        Volume INTEGER,
+        TurnoverInBEST REAL,
+        TotalTurnover REAL,
+        PRIMARY KEY (Symbol, Date)
+    )
+    ''')
+    in_transaction = cursor.connection.in_transaction
+    cursor.execute('DELETE FROM temp.StockDataCold')
+    for block_symbol, year, block in blocks:
+        cursor.executemany(
+            'INSERT INTO temp.StockDataCold VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [row for row in _decode_block(block_symbol, year, block)
+             if (not from_date or row[1] >= from_date) and (not to_date or row[1] <= to_date)]
+        )
+    if not in_transaction:
+        cursor.connection.commit()  # Only touched the temp schema; leave the caller's transaction open
+    return ARCHIVE_STITCHED_SOURCE
+
+
+def compact_history(keep_years=2, vacuum=False):
+    """
+    Moves closed years of StockData into compressed per-(symbol, year) blocks.
+
+    The current year and the keep_years - 1 before it stay as live rows; older years are
+    folded into StockDataArchive, one transaction per block, and deleted from StockData.
+    A block that already exists is merged with the live rows, so late backfills end up
+    archived on the next run. Readers in this module stitch the blocks back in, so the
+    rows they return don't change. Returns {"blocks": ..., "rows": ...}.
+    """
+    cutoff = f"{datetime.now().year - keep_years + 1:04d}-01-01"
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    blocks = moved = 0
+    try:
+        cursor.execute("SELECT DISTINCT Symbol, substr(Date, 1, 4) FROM StockData WHERE Date < ?", (cutoff,))
+        for symbol, year in cursor.fetchall():
+            year = int(year)
+            bounds = (f"{year:04d}-01-01", f"{year:04d}-12-31")
+            cursor.execute(f'''
+            SELECT Date, {', '.join(ARCHIVE_COLUMNS)}
+            FROM StockData
+            WHERE Symbol = ? AND Date BETWEEN ? AND ?
+            ''', (symbol, *bounds))
+            live = cursor.fetchall()
+
+            merged = {}
+            cursor.execute("SELECT Block FROM StockDataArchive WHERE Symbol = ? AND Year = ?", (symbol, year))
+            existing = cursor.fetchone()
+            if existing:
+                merged.update((row[1], row[2:]) for row in _decode_block(symbol, year, existing[0]))
+            merged.update((row[0], row[1:]) for row in live)
+            rows = [(day, *merged[day]) for day in sorted(merged)]
+
+            cursor.execute('''
+            INSERT OR REPLACE INTO StockDataArchive (Symbol, Year, Rows, FirstDate, LastDate, Block)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (symbol, year, len(rows), rows[0][0], rows[-1][0], _encode_block(year, rows)))
+            cursor.execute("DELETE FROM StockData WHERE Symbol = ? AND Date BETWEEN ? AND ?", (symbol, *bounds))
+            db.commit()
+            blocks += 1
+            moved += len(live)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    if vacuum and blocks:
+        db.execute('VACUUM')  # Give the freed pages back to the file system
+    print(f"Compacted {moved} StockData rows into {blocks} archive blocks.")
+    return {"blocks": blocks, "rows": moved}
+
+
+# Bumped by the ingest path whenever StockData changes in this process
+_data_generation = 0
+_generation_lock = threading.Lock()
+_lookup_cache = {}
+
+
+def bump_data_generation():
+    """Invalidates cached lookups after new data has been committed."""
+    global _data_generation
+    with _generation_lock:
+        _data_generation += 1
+
+
+def data_generation():
+    """
+    Version of the data as seen by this process.
+
+    Combines the in-process ingest counter with the published read snapshot, so writes
+    made by another process (e.g. the fundamental scraper) also invalidate the cache
+    once they publish a snapshot. Neither part needs a database query.
+    """
+    return _data_generation, current_read_snapshot()
+
+
+def cached_by_generation(function):
+    """Caches a lookup's result until the data generation changes."""
+    @functools.wraps(function)
+    def wrapper():
+        generation = data_generation()  # Taken before the query, so a concurrent ingest isn't missed
+        cached = _lookup_cache.get(function.__name__)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        result = function()
+        _lookup_cache[function.__name__] = (generation, result)
+        return result
+    wrapper.uncached = function
+    return wrapper
+
+
 #Fetch symbols to populate drop down
+@cached_by_generation
 def fetch_symbols():
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT DISTINCT Symbol FROM StockData")
+        cursor.execute(_archive_query(cursor, FETCH_SYMBOLS_QUERY, FETCH_LIVE_SYMBOLS_QUERY))
         issuers = [row[0] for row in cursor.fetchall()]
     finally:
         cursor.close()
     return issuers if issuers else None
+
+@cached_by_generation
 def fetch_issuers():
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT DISTINCT issuer FROM recommendations")
+        cursor.execute(FETCH_ISSUERS_QUERY)
         issuers = cursor.fetchall()
     finally:
         cursor.close()
     return issuers if issuers else None
 
-def extract_issuer_rows(from_date, issuer, to_date):
-    query = """
+def build_issuer_rows_query(from_date, issuer, to_date, search=None, after=None, limit=None,
+                            source="StockData"):
+    """
+    Builds the filtered StockData query used by extract_issuer_rows.
+
+    Rows come newest first, ties broken by symbol. `search` keeps symbols containing the
+    text, `after` is the (Date, Symbol) of the last row already seen (keyset pagination)
+    and `limit` caps the page size. `source` comes from _stock_data_source.
+    """
+    query = f"""
         SELECT * 
-        FROM StockData 
+        FROM {source} 
         WHERE 1=1
     """
     params = []
     if from_date:
-        query += """
-        AND CAST(SUBSTR(Date, -4, 4) || '-' ||
-                 printf('%02d', CAST(SUBSTR(Date, 1, INSTR(Date, '/') - 1) AS INTEGER)) || '-' ||
-                 printf('%02d', CAST(SUBSTR(Date, INSTR(Date, '/') + 1, LENGTH(Date) - INSTR(Date, '/')) AS INTEGER))
-             AS TEXT) >= ?
-        """
+        query += " AND Date >= ?"
         params.append(from_date)
     if to_date:
-        query += """
-        AND CAST(SUBSTR(Date, -4, 4) || '-' ||
-                 printf('%02d', CAST(SUBSTR(Date, 1, INSTR(Date, '/') - 1) AS INTEGER)) || '-' ||
-                 printf('%02d', CAST(SUBSTR(Date, INSTR(Date, '/') + 1, LENGTH(Date) - INSTR(Date, '/')) AS INTEGER))
-             AS TEXT) <= ?
-        """
+        query += " AND Date <= ?"
         params.append(to_date)
     if issuer != "ALL":
         query += " AND Symbol = ?"
         params.append(issuer)
-    # Add ORDER BY clause to sort by date
-    query += """
-    ORDER BY CAST(SUBSTR(Date, -4, 4) || '-' ||
-                  printf('%02d', CAST(SUBSTR(Date, 1, INSTR(Date, '/') - 1) AS INTEGER)) || '-' ||
-                  printf('%02d', CAST(SUBSTR(Date, INSTR(Date, '/') + 1, LENGTH(Date) - INSTR(Date, '/')) AS INTEGER))
-              AS TEXT) DESC
-    """
+    if search:
+        query += " AND Symbol LIKE ? ESCAPE '\\'"
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f"%{escaped}%")
+    if after:
+        # Continue strictly after the last row of the previous page
+        query += " AND (Date, Symbol) < (?, ?)"
+        params.extend(after)
+    # Dates are stored as ISO-8601, so they sort chronologically as text
+    query += " ORDER BY Date DESC, Symbol DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+
+def extract_issuer_rows(from_date, issuer, to_date, search=None, after=None, limit=None):
     # Fetch filtered rows from the database
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
+        source = _stock_data_source(cursor, from_date, to_date, issuer if issuer != "ALL" else None)
+        query, params = build_issuer_rows_query(from_date, issuer, to_date, search, after, limit, source)
         cursor.execute(query, params)
         rows = cursor.fetchall()
     finally:
         cursor.close()
     return rows if rows else None
 
+
+def get_symbol_watermark(symbol):
+    """Returns (row count, latest date) for a symbol, used to tell if derived data is stale."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(_archive_query(cursor, SYMBOL_WATERMARK_QUERY, SYMBOL_LIVE_WATERMARK_QUERY),
+                       {'symbol': symbol})
+        rows, last_date = cursor.fetchone()
+    finally:
+        cursor.close()
+    return rows, last_date
+
+
+def fetch_symbol_history(symbol, read_only=False):
+    """
+    Returns the symbol's rows in date order, with the columns in SYMBOL_HISTORY_COLUMNS.
+
+    read_only reads from the published snapshot instead of the live database.
+    """
+    connection = DatabaseConnection()
+    db = connection.get_read_connection() if read_only else connection.get_connection()
+    cursor = db.cursor()
+    try:
+        source = _stock_data_source(cursor, symbol=symbol)
+        cursor.execute(SYMBOL_HISTORY_QUERY.format(source=source), (symbol,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return rows
+
+
 def retrieve_top_10():
     db = DatabaseConnection().get_connection()
     cursor = db.cursor()
     try:
     # Find the latest date in the database
-        latest_date_query = """
-        SELECT Date 
-        FROM StockData
-        ORDER BY CAST(SUBSTR(Date, 7, 4) || SUBSTR(Date, 1, 2) || SUBSTR(Date, 4, 2) AS INTEGER) DESC
-        LIMIT 1
-        """
-        cursor.execute(latest_date_query)
+        cursor.execute(LATEST_DATE_QUERY)
         latest_date = cursor.fetchone()
         latest_date = latest_date[0] if latest_date else None
         if not latest_date:
@@ -263,20 +1686,277 @@ def retrieve_top_10():
             stocks = []
         else:
             # Retrieve the top 10 most tradeable stocks
-            query = """
-            SELECT 
-                Symbol, 
-                AvgPrice,
-                PercentageChange,
-                CAST(REPLACE(Volume, '.', '') AS INTEGER) AS DailyTotalVolume,
-                TotalTurnover
-            FROM StockData
-            WHERE Date = ?
-            ORDER BY DailyTotalVolume DESC
-            LIMIT 10
-            """
-            cursor.execute(query, (latest_date,))
+            cursor.execute(TOP_10_QUERY, (latest_date,))
             stocks = cursor.fetchall()
     finally:
         cursor.close()
-    return stocks
\ No newline at end of file
+    return stocks
+
+
+def range_returns(from_date, to_date, order=None, limit=None):
+    """
+    Returns (symbol, return) pairs for every symbol between two dates.
+
+    Each return runs from the last close on or before from_date to the last close on or
+    before to_date; symbols with no close by from_date are left out. Every symbol costs
+    two index seeks into the CumLogReturn prefix sums, however long the range is.
+    order ('asc' or 'desc') sorts by return and limit keeps the first rows.
+    """
+    query = RANGE_RETURNS_QUERY
+    params = {'from_date': from_date, 'to_date': to_date}
+    if order:
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unknown order {order}, expected asc or desc")
+        query += f" ORDER BY LogReturn {order.upper()} NULLS LAST, Symbol"
+    if limit:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return [(symbol, math.exp(log_return) - 1) for symbol, log_return in rows if log_return is not None]
+
+
+def top_gainers(days=30, limit=10, losers=False):
+    """
+    Ranks symbols by their return over the `days` calendar days up to the latest trading day.
+
+    Returns (from_date, to_date, [(symbol, return), ...]); losers=True ranks from the bottom.
+    """
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(LATEST_DATE_QUERY)
+        to_date = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if not to_date:
+        return None, None, []
+    from_date = (date.fromisoformat(to_date) - timedelta(days=days)).isoformat()
+    return from_date, to_date, range_returns(from_date, to_date, 'asc' if losers else 'desc', limit)
+
+
+def _range_extremes(cursor, symbol, from_date, to_date):
+    cursor.execute(RANGE_POSITIONS_QUERY, {'symbol': symbol, 'from_date': from_date, 'to_date': to_date})
+    first, last = cursor.fetchone()
+    if first is None or last is None or first > last:
+        return None
+    level = (last - first + 1).bit_length() - 1
+    cursor.execute(RANGE_EXTREMES_QUERY, (symbol, level, first, last - (1 << level) + 1))
+    return cursor.fetchone()
+
+
+def range_high_low(symbol, from_date, to_date):
+    """Returns the symbol's (highest Max, lowest Min) between two dates, or None without trading days."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        return _range_extremes(cursor, symbol, from_date, to_date)
+    finally:
+        cursor.close()
+
+
+def high_low_screen(days=365):
+    """
+    Range high and low of every symbol over the `days` calendar days up to the latest
+    trading day (365 for 52-week highs/lows).
+
+    Returns (from_date, to_date, [(symbol, close, high, low), ...]), using four index
+    lookups per symbol. Symbols without a close or range in the window are left out.
+    """
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(LATEST_DATE_QUERY)
+        to_date = cursor.fetchone()[0]
+        if not to_date:
+            return None, None, []
+        from_date = (date.fromisoformat(to_date) - timedelta(days=days)).isoformat()
+        cursor.execute("SELECT Symbol FROM SymbolTracking")
+        screen = []
+        for (symbol,) in cursor.fetchall():
+            extremes = _range_extremes(cursor, symbol, from_date, to_date)
+            if extremes is None:
+                continue
+            cursor.execute(LAST_CLOSE_QUERY, (symbol, to_date))
+            close = cursor.fetchone()[0]
+            if close is None or None in extremes:
+                continue  # No price on any day yet, nothing to screen
+            screen.append((symbol, close, *extremes))
+    finally:
+        cursor.close()
+    return from_date, to_date, screen
+
+
+def rolling_high_low(symbol, window, read_only=False):
+    """
+    Highest Max and lowest Min of the `window` trading days ending at each of the
+    symbol's days (None before the first full window), in date order.
+
+    Reads a single sparse-table level, so each window costs O(1) instead of a rescan.
+    """
+    level = window.bit_length() - 1
+    width = 1 << level
+    connection = DatabaseConnection()
+    db = connection.get_read_connection() if read_only else connection.get_connection()
+    cursor = db.cursor()
+    try:
+        if not _table_exists(cursor, 'StockRangeIndex'):
+            return None  # Read snapshot published before the index existed
+        cursor.execute(RANGE_INDEX_LEVEL_QUERY, (symbol, level, 0, sys.maxsize))
+        entries = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not entries:
+        return None
+
+    count = len(entries) + width - 1
+    highs, lows = [None] * count, [None] * count
+    for end in range(window - 1, count):
+        first, second = entries[end - window + 1], entries[end - width + 1]
+        highs[end] = _higher(first[0], second[0])
+        lows[end] = _lower(first[1], second[1])
+    return highs, lows
+
+
+# Columnar export of StockData queried by the DuckDB backend of aggregate_stock_data
+ANALYTICS_PARQUET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'analytics',
+                                      'stock_data.parquet')
+
+AGGREGATE_METRICS = ('LastTradePrice', 'Max', 'Min', 'AvgPrice', 'PercentageChange', 'Volume',
+                     'TurnoverInBEST', 'TotalTurnover')
+AGGREGATE_FUNCTIONS = {'avg': 'AVG', 'sum': 'SUM', 'min': 'MIN', 'max': 'MAX', 'count': 'COUNT'}
+# strftime formats understood identically by SQLite and DuckDB
+TIME_BUCKETS = {'day': '%Y-%m-%d', 'week': '%Y-W%W', 'month': '%Y-%m', 'year': '%Y'}
+
+
+def analytics_backend_available():
+    """True when DuckDB is installed and StockData has been exported for it."""
+    return duckdb is not None and os.path.exists(ANALYTICS_PARQUET_PATH)
+
+
+def export_analytics_data(batch_size=50000):
+    """
+    Exports StockData to Parquet for the DuckDB backend; returns the number of rows.
+
+    Rows are streamed through a temporary CSV so the export needs no pandas, and the
+    Parquet file is swapped in atomically.
+    """
+    if duckdb is None:
+        raise RuntimeError("DuckDB is not installed; pip install duckdb to enable the analytics backend")
+
+    os.makedirs(os.path.dirname(ANALYTICS_PARQUET_PATH), exist_ok=True)
+    csv_path = f"{ANALYTICS_PARQUET_PATH}.csv.tmp"
+    parquet_path = f"{ANALYTICS_PARQUET_PATH}.tmp"
+    exported = 0
+
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"""
+        SELECT Symbol, Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange,
+               Volume, TurnoverInBEST, TotalTurnover
+        FROM {_stock_data_source(cursor)}
+        """)
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow([column[0] for column in cursor.description])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                exported += len(rows)
+    finally:
+        cursor.close()
+
+    try:
+        with duckdb.connect() as connection:
+            connection.read_csv(csv_path, header=True, dtype={
+                'Symbol': 'VARCHAR', 'Date': 'DATE', 'LastTradePrice': 'DOUBLE', 'Max': 'DOUBLE',
+                'Min': 'DOUBLE', 'AvgPrice': 'DOUBLE', 'PercentageChange': 'DOUBLE', 'Volume': 'BIGINT',
+                'TurnoverInBEST': 'DOUBLE', 'TotalTurnover': 'DOUBLE'
+            }).write_parquet(parquet_path)
+        os.replace(parquet_path, ANALYTICS_PARQUET_PATH)
+    finally:
+        os.remove(csv_path)
+    return exported
+
+
+def aggregate_stock_data(metric, agg='avg', bucket='month', by_symbol=False,
+                         from_date=None, to_date=None, backend='auto'):
+    """
+    Aggregates a StockData column per time bucket (and optionally per symbol).
+
+    e.g. aggregate_stock_data('TotalTurnover', 'avg', 'month') gives the average turnover
+    by month across all issuers. backend is 'sqlite', 'duckdb' (vectorized, over the
+    Parquet export) or 'auto', which uses DuckDB when it is available.
+    Returns (bucket, [symbol,] value) tuples ordered by bucket and symbol.
+    """
+    if metric not in AGGREGATE_METRICS:
+        raise ValueError(f"Unknown metric {metric}, expected one of {', '.join(AGGREGATE_METRICS)}")
+    if agg not in AGGREGATE_FUNCTIONS:
+        raise ValueError(f"Unknown aggregate {agg}, expected one of {', '.join(AGGREGATE_FUNCTIONS)}")
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket}, expected one of {', '.join(TIME_BUCKETS)}")
+    if backend == 'auto':
+        backend = 'duckdb' if analytics_backend_available() else 'sqlite'
+
+    if backend == 'duckdb':
+        if not analytics_backend_available():
+            raise RuntimeError("DuckDB backend unavailable: install duckdb and run export_analytics_data()")
+        bucket_sql = f"strftime(Date, '{TIME_BUCKETS[bucket]}')"
+        table = "read_parquet(?)"
+        params = [ANALYTICS_PARQUET_PATH]
+    elif backend == 'sqlite':
+        bucket_sql = f"strftime('{TIME_BUCKETS[bucket]}', Date)"
+        table = "{source}"  # Filled in below, once the archived years in range are known
+        params = []
+    else:
+        raise ValueError(f"Unknown backend {backend}")
+
+    group_columns = ["Bucket", "Symbol"] if by_symbol else ["Bucket"]
+    query = f"""
+        SELECT {bucket_sql} AS Bucket, {'Symbol, ' if by_symbol else ''}{AGGREGATE_FUNCTIONS[agg]}({metric}) AS Value
+        FROM {table}
+        WHERE 1=1
+    """
+    if from_date:
+        query += " AND Date >= ?"
+        params.append(from_date)
+    if to_date:
+        query += " AND Date <= ?"
+        params.append(to_date)
+    query += f" GROUP BY {', '.join(group_columns)} ORDER BY {', '.join(group_columns)}"
+
+    if backend == 'duckdb':
+        with duckdb.connect() as connection:
+            return connection.execute(query, params).fetchall()
+
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(query.format(source=_stock_data_source(cursor, from_date, to_date)), params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def explain_query_plan(query, params=()):
+    """Returns the detail lines of EXPLAIN QUERY PLAN for a statement."""
+    db = DatabaseConnection().get_connection()
+    cursor = db.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+if __name__ == '__main__':
+    init_createDB()
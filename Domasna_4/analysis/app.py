@@ -5,17 +5,28 @@ import os
 from datetime import datetime, timedelta
 import asyncio
 from filters.F1 import filter_1
-from filters.F3 import filter_3
+from filters.F3 import refresh_issuers
 from filters.F3 import reformat_number
-from DB import init_createDB, get_last_saved_date, update_data, fetch_issuers, extract_issuer_rows, retrieve_top_10, \
-    DatabaseConnection, fetch_symbols
+# Same module path as the filters and services use, so they all share one connection pool
+from Domasna_4.analysis.DB import init_createDB, fetch_issuers, extract_issuer_rows, retrieve_top_10, \
+    DatabaseConnection, fetch_symbols, publish_read_snapshot, export_analytics_data, \
+    ANALYTICS_ENABLED, compact_history, range_returns, top_gainers, high_low_screen
+from Domasna_4.analysis.snapshots import export_symbol_snapshot
+from Domasna_4.analysis.ingest_scheduler import IngestScheduler
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
 app = Flask(__name__)
 
+# Rows per page of the historical data table and its JSON endpoint
+HISTORY_PAGE_SIZE = 100
+HISTORY_COLUMNS = ['Symbol', 'Date', 'LastTradePrice', 'Max', 'Min', 'AvgPrice', 'PercentageChange',
+                   'Volume', 'TurnoverInBEST', 'TotalTurnover']
+
 # Initialize the database
 init_createDB()
+# Republish on startup: init_createDB may have added tables the services read
+publish_read_snapshot()
 
 def rescrape_and_update_data():
     """Rescrape data and update the database."""
@@ -23,37 +34,81 @@ def rescrape_and_update_data():
     issuers = filter_1()
     today_date = datetime.now().strftime('%m/%d/%Y')
 
-    for issuer in issuers:
-        last_saved_date = get_last_saved_date(issuer)
-        if not last_saved_date or last_saved_date != today_date:
-            print(f"Updating data for issuer: {issuer}")
-            raw_data = asyncio.run(filter_3(issuer, last_saved_date or "11/10/2014"))
-
-            # Reformat numeric fields in the fetched data
-            formatted_data = []
-            for row in raw_data:
-                formatted_row = [
-                    row[0],  # Date
-                    reformat_number(row[1]),  # LastTradePrice
-                    reformat_number(row[2]),  # Max
-                    reformat_number(row[3]),  # Min
-                    reformat_number(row[4]),  # AvgPrice
-                    reformat_number(row[5]),  # PercentageChange
-                    str(reformat_number(row[6])),  # Volume
-                    str(reformat_number(row[7])),  # TurnoverInBEST
-                    str(reformat_number(row[8]))  # TotalTurnover
-                ]
-                formatted_data.append(formatted_row)
-
-            update_data(issuer, formatted_data, today_date)
+    # Watermark reads and writes go through the async DB facade inside one event loop
+    updated, result = asyncio.run(refresh_issuers(issuers, today_date))
+    print(f"Inserted {result['inserted']} rows, skipped {result['skipped']} existing rows.")
+
+    # Refresh the columnar snapshots the analysis services read from
+    for issuer in updated:
+        export_symbol_snapshot(issuer)
+
+    # Fold years that have closed into the compressed archive (no-op most days)
+    compact_history()
+
+    # Let the analytics services switch to a consistent copy of the new data
+    publish_read_snapshot()
+    if ANALYTICS_ENABLED:
+        export_analytics_data()
 
     print("Rescraping process completed.")
+    return {**result, "issuers_updated": len(updated)}
+
+
+def scheduled_ingest():
+    """Background ingest run; returns its pooled connection when done."""
+    try:
+        return rescrape_and_update_data()
+    finally:
+        DatabaseConnection().release_connection()
+
+
+# Rescrape in the background once the data is older than INGEST_TTL_SECONDS
+ingest_scheduler = IngestScheduler(
+    scheduled_ingest,
+    ttl=int(os.environ.get('INGEST_TTL_SECONDS', 3600)),
+    check_interval=int(os.environ.get('INGEST_CHECK_SECONDS', 60))
+)
+
+
+@app.before_request
+def start_ingest_scheduler():
+    # Started by the first request, so only a process that serves pages ingests
+    # (not the Flask reloader's watcher process)
+    ingest_scheduler.start()
+
+@app.template_filter('mk_number')
+def mk_number(value):
+    """Formats a stored number for display the way mse.mk shows it (1.234,56)."""
+    if value is None:
+        return ''
+    return reformat_number(str(value))
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the request's database connection to the pool."""
+    DatabaseConnection().release_connection()
+
+
+def encode_history_cursor(row):
+    """Builds the keyset cursor ("Date|Symbol") that points after the given row."""
+    return f"{row[1]}|{row[0]}"
+
+
+def decode_history_cursor(cursor):
+    if not cursor or '|' not in cursor:
+        return None
+    date, symbol = cursor.split('|', 1)
+    return date, symbol
+
+
+def fetch_history_page(from_date, issuer, to_date, search=None, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """Returns one page of history rows and the cursor of the next page (None on the last one)."""
+    # Ask for one extra row to know whether another page follows
+    rows = extract_issuer_rows(from_date, issuer, to_date, search=search,
+                               after=decode_history_cursor(cursor), limit=limit + 1) or []
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
 
-# @app.teardown_appcontext
-# def close_db_connection(exception=None):
-#     """Close the database connection on application teardown."""
-#     DatabaseConnection().close_connection()
-#     print("Database connection closed.")
 
 @app.route('/')
 def index():
@@ -62,12 +117,11 @@ def index():
     from_date = request.args.get('from_date', (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'))
     to_date = request.args.get('to_date', datetime.now().strftime('%Y-%m-%d'))
     issuer = request.args.get('issuer', 'ALL')
-    # Rescrape and update the database
-    rescrape_and_update_data()
+    search = request.args.get('search', '')
     # Fetch issuers for the dropdown
     issuers = fetch_symbols()
-    # Build query based on filters
-    rows = extract_issuer_rows(from_date, issuer, to_date)
+    # Only the first page is rendered, the rest is loaded from /api/history
+    rows, next_cursor = fetch_history_page(from_date, issuer, to_date, search=search)
     # Render the template with fetched data
     return render_template(
         'index.html',
@@ -75,9 +129,114 @@ def index():
         issuers=issuers,
         from_date=from_date,
         to_date=to_date,
-        issuer=issuer
+        issuer=issuer,
+        search=search,
+        next_cursor=next_cursor
     )
 
+
+@app.route('/api/history')
+def history_api():
+    """Paginated historical data as JSON, filtered by date range, issuer and symbol search."""
+    try:
+        limit = min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1000)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    rows, next_cursor = fetch_history_page(
+        request.args.get('from_date'),
+        request.args.get('issuer', 'ALL'),
+        request.args.get('to_date'),
+        search=request.args.get('search'),
+        cursor=request.args.get('cursor'),
+        limit=limit
+    )
+    return jsonify({
+        "rows": [dict(zip(HISTORY_COLUMNS, row)) for row in rows],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/returns')
+def returns_api():
+    """Return of every issuer between from_date and to_date (YYYY-MM-DD), best first."""
+    from_date = request.args.get('from_date')
+    to_date = request.args.get('to_date', datetime.now().strftime('%Y-%m-%d'))
+    if not from_date:
+        return jsonify({"error": "from_date is required"}), 400
+    returns = range_returns(from_date, to_date, order='desc')
+    return jsonify({
+        "from_date": from_date,
+        "to_date": to_date,
+        "returns": [{"symbol": symbol, "return": value} for symbol, value in returns]
+    })
+
+
+@app.route('/api/top-gainers')
+def top_gainers_api():
+    """Best (or, with losers=1, worst) performing issuers over the last `days` days."""
+    try:
+        days = int(request.args.get('days', 30))
+        limit = min(int(request.args.get('limit', 10)), 1000)
+    except ValueError:
+        return jsonify({"error": "days and limit must be integers"}), 400
+    if days < 1 or limit < 1:
+        return jsonify({"error": "days and limit must be positive"}), 400
+
+    from_date, to_date, returns = top_gainers(days, limit, losers=request.args.get('losers') == '1')
+    return jsonify({
+        "from_date": from_date,
+        "to_date": to_date,
+        "returns": [{"symbol": symbol, "return": value} for symbol, value in returns]
+    })
+
+
+@app.route('/api/high-low')
+def high_low_api():
+    """
+    Range high/low screen over the last `days` days (default 365, i.e. 52-week highs/lows).
+
+    screen=high keeps issuers trading within `within` percent of their high, screen=low
+    within `within` percent of their low.
+    """
+    try:
+        days = int(request.args.get('days', 365))
+        within = float(request.args.get('within', 5))
+    except ValueError:
+        return jsonify({"error": "days must be an integer and within a number"}), 400
+    screen = request.args.get('screen')
+    if days < 1 or screen not in (None, 'high', 'low'):
+        return jsonify({"error": "days must be positive and screen one of high, low"}), 400
+
+    from_date, to_date, rows = high_low_screen(days)
+    results = []
+    for symbol, close, high, low in rows:
+        if screen == 'high' and not close >= high * (1 - within / 100):
+            continue
+        if screen == 'low' and not close <= low * (1 + within / 100):
+            continue
+        results.append({"symbol": symbol, "close": close, "high": high, "low": low})
+    return jsonify({"from_date": from_date, "to_date": to_date, "results": results})
+
+
+@app.route('/api/ingest/status')
+def ingest_status():
+    """State of the background ingest: last run, its result, and when the next one is due."""
+    return jsonify(ingest_scheduler.status())
+
+
+def query_stats():
+    """Per-query timing histograms and the most recent slow queries."""
+    return jsonify(DatabaseConnection().query_stats())
+
+
+# The stats hold raw SQL, bound parameters and caller names, so they are only served
+# in debug mode (FLASK_DEBUG=1) or when QUERY_STATS_ENDPOINT=1 asks for them
+if app.debug or os.environ.get('QUERY_STATS_ENDPOINT') == '1':
+    app.add_url_rule('/debug/query-stats', view_func=query_stats)
+
+
 @app.route('/dashboard')
 def dashboard():
     stocks = retrieve_top_10()
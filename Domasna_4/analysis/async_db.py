@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from Domasna_4.analysis.DB import DatabaseConnection, DEFAULT_INGEST_BATCH_SIZE, bulk_ingest, get_last_saved_date, \
+    insert_stock_data, update_last_date
+
+
+def _run(function, *args):
+    """Runs function on a worker thread, then returns the thread's connection to the pool."""
+    try:
+        return function(*args)
+    finally:
+        DatabaseConnection().release_connection()
+
+
+class AsyncDB:
+    """
+    Asyncio facade over the blocking DB.py functions.
+
+    Reads run on a small thread pool and every write runs on one dedicated writer thread,
+    so writes stay serialized (SQLite allows a single writer) while coroutines keep
+    fetching over HTTP. Each call borrows a pooled connection on its worker thread and
+    hands it back when it returns, so no connection is left behind on a worker.
+
+        async with AsyncDB() as db:
+            last_date = await db.get_last_saved_date('ALK')
+            await db.insert_stock_data('ALK', rows)
+    """
+
+    def __init__(self, readers=4):
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+
+    async def read(self, function, *args):
+        """Runs a blocking read function on the reader pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._readers, _run, function, *args)
+
+    async def write(self, function, *args):
+        """Runs a blocking write function on the writer thread, in submission order."""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, _run, function, *args)
+
+    async def get_last_saved_date(self, symbol):
+        return await self.read(get_last_saved_date, symbol)
+
+    async def insert_stock_data(self, symbol, data):
+        return await self.write(insert_stock_data, symbol, data)
+
+    async def update_last_date(self, symbol, last_date):
+        return await self.write(update_last_date, symbol, last_date)
+
+    async def bulk_ingest(self, issuer_data, checkpoints=()):
+        return await self.write(bulk_ingest, issuer_data, DEFAULT_INGEST_BATCH_SIZE, checkpoints)
+
+    def close(self):
+        """Waits for pending writes and reads; their connections are already back in the pool."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Shutting down blocks until queued writes finish, so keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,81 @@
+"""
+Compares market-wide aggregates on the SQLite and DuckDB backends of aggregate_stock_data,
+plus the old approach of pulling every row through extract_issuer_rows("ALL").
+
+Run from the repository root:
+    python -m Domasna_4.analysis.benchmarks.analytics_benchmark --repeat 5
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from Domasna_4.analysis.DB import (
+    aggregate_stock_data, analytics_backend_available, export_analytics_data, extract_issuer_rows, ANALYTICS_ENABLED,
+    TIME_BUCKETS
+)
+
+# (metric, aggregate, bucket, by_symbol)
+QUERIES = [
+    ('TotalTurnover', 'avg', 'month', False),
+    ('Volume', 'sum', 'year', True),
+    ('LastTradePrice', 'max', 'week', True),
+    ('PercentageChange', 'avg', 'day', False),
+]
+
+
+def pandas_style_baseline(metric, agg, bucket, by_symbol):
+    """The pre-existing path: fetch every row, then aggregate in Python."""
+    column = ['Symbol', 'Date', 'LastTradePrice', 'Max', 'Min', 'AvgPrice', 'PercentageChange',
+              'Volume', 'TurnoverInBEST', 'TotalTurnover'].index(metric)
+    groups = defaultdict(list)
+    for row in extract_issuer_rows(None, "ALL", None) or []:
+        if row[column] is None:
+            continue
+        key = datetime.strptime(row[1], '%Y-%m-%d').strftime(TIME_BUCKETS[bucket])
+        groups[(key, row[0]) if by_symbol else key].append(row[column])
+    reduce = {'avg': lambda v: sum(v) / len(v), 'sum': sum, 'min': min, 'max': max, 'count': len}[agg]
+    return sorted((key, reduce(values)) for key, values in groups.items())
+
+
+def time_call(function, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per query, the best one is reported')
+    parser.add_argument('--skip-export', action='store_true', help='reuse the existing Parquet export')
+    args = parser.parse_args()
+
+    if ANALYTICS_ENABLED and not args.skip_export:
+        started = time.perf_counter()
+        rows = export_analytics_data()
+        print(f"Exported {rows} rows to Parquet in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"{'query':<42}{'python rows':>14}{'sqlite':>12}{'duckdb':>12}{'groups':>9}")
+    for metric, agg, bucket, by_symbol in QUERIES:
+        name = f"{agg}({metric}) by {bucket}{' and symbol' if by_symbol else ''}"
+        baseline_time, _ = time_call(lambda: pandas_style_baseline(metric, agg, bucket, by_symbol), args.repeat)
+        sqlite_time, sqlite_rows = time_call(
+            lambda: aggregate_stock_data(metric, agg, bucket, by_symbol, backend='sqlite'), args.repeat)
+        if analytics_backend_available():
+            duckdb_time, duckdb_rows = time_call(
+                lambda: aggregate_stock_data(metric, agg, bucket, by_symbol, backend='duckdb'), args.repeat)
+            duckdb_column = f"{duckdb_time * 1000:>10.1f}ms"
+            if len(duckdb_rows) != len(sqlite_rows):
+                print(f"  warning: {name} returned {len(duckdb_rows)} groups on DuckDB, {len(sqlite_rows)} on SQLite")
+        else:
+            duckdb_column = f"{'n/a':>12}"
+        print(f"{name:<42}{baseline_time * 1000:>12.1f}ms{sqlite_time * 1000:>10.1f}ms{duckdb_column}"
+              f"{len(sqlite_rows):>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Compares F3.parse_data (results-table scanner) with the BeautifulSoup parser it replaced,
+on saved mse.mk history pages: rows/sec, peak memory, and whether the rows are identical.
+
+Run from the repository root:
+    python -m Domasna_4.analysis.benchmarks.parse_benchmark --pages path/to/saved/pages
+Without --pages, pages in the mse.mk layout are rendered from the local StockData.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from datetime import date
+
+from Domasna_4.analysis.DB import extract_issuer_rows, fetch_symbols
+from Domasna_4.analysis.fetch_planner import HISTORY_WINDOW_DAYS
+from Domasna_4.analysis.filters.F3 import parse_data, parse_data_soup
+
+PARSERS = {
+    'BeautifulSoup (html.parser)': parse_data_soup,
+    'results-table scanner': parse_data,
+}
+
+# Enough navigation/script markup around the table to resemble a real history page
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="mk">
+<head><meta charset="utf-8"><title>Историски податоци - {symbol}</title>
+<script type="text/javascript">{script}</script></head>
+<body>
+<nav class="navbar">{navigation}</nav>
+<form method="post" action="/mk/stats/symbolhistory/{symbol}">
+<input type="text" id="FromDate" name="FromDate" value="{from_date}">
+<input type="text" id="ToDate" name="ToDate" value="{to_date}">
+</form>
+<table id="resultsTable" class="table table-bordered table-condensed table-striped">
+<thead><tr><th>Датум</th><th>Цена на последна трансакција</th><th>Мак.</th><th>Мин.</th>
+<th>Просечна цена</th><th>%пром.</th><th>Количина</th><th>Промет во БЕСТ во денари</th>
+<th>Вкупен промет во денари</th></tr></thead>
+<tbody>
+{rows}
+</tbody>
+</table>
+<footer>{navigation}</footer>
+</body>
+</html>
+"""
+NAVIGATION = "".join(f'<li class="nav-item"><a href="/mk/page/{i}">Линк {i} &amp; повеќе</a></li>' for i in range(150))
+SCRIPT = "var settings = {" + ", ".join(f'"key{i}": "value {i}"' for i in range(400)) + "};"
+
+
+def format_number(value, decimals=2):
+    return '' if value is None else f"{value:,.{decimals}f}"
+
+
+def render_page(symbol, rows, navigation=NAVIGATION):
+    """Renders (newest first) StockData rows the way mse.mk shows them."""
+    cells = []
+    for row in rows:
+        day = date.fromisoformat(row[1])
+        values = [f"{day.month}/{day.day}/{day.year}", format_number(row[2]), format_number(row[3]),
+                  format_number(row[4]), format_number(row[5]), format_number(row[6]),
+                  format_number(row[7], 0), format_number(row[8], 0), format_number(row[9], 0)]
+        cells.append("<tr>" + "".join(f"<td>{value}</td>" for value in values) + "</tr>")
+    return PAGE_TEMPLATE.format(symbol=symbol, script=SCRIPT, navigation=navigation, rows="\n".join(cells),
+                                from_date=rows[-1][1] if rows else '', to_date=rows[0][1] if rows else '')
+
+
+def render_pages(limit):
+    """One page per symbol and 364-day window, like a backfill fetches them."""
+    pages = []
+    for symbol in (fetch_symbols() or [])[:limit]:
+        window = []
+        for row in extract_issuer_rows(None, symbol, None) or []:
+            if window and (date.fromisoformat(window[0][1]) - date.fromisoformat(row[1])).days > HISTORY_WINDOW_DAYS:
+                pages.append(render_page(symbol, window))
+                window = []
+            window.append(row)
+        if window:
+            pages.append(render_page(symbol, window))
+    return pages
+
+
+def load_pages(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.htm*'))):
+        with open(path, 'r', encoding='utf-8') as file:
+            pages.append(file.read())
+    return pages
+
+
+def measure(parser, pages, repeat):
+    """Returns (best seconds over all pages, rows, peak traced memory in bytes)."""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = sum(len(parser(page)) for page in pages)
+        best = min(best, time.perf_counter() - started)
+
+    # Separate pass, tracemalloc slows the parsers down
+    tracemalloc.start()
+    for page in pages:
+        parser(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, rows, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', help='directory of saved mse.mk history pages (*.html)')
+    parser.add_argument('--symbols', type=int, default=20, help='symbols to render pages for without --pages')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per parser, the best one is reported')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages) if args.pages else render_pages(args.symbols)
+    if not pages:
+        print("No pages to parse.")
+        return
+    size = sum(len(page) for page in pages)
+    print(f"{len(pages)} pages, {size / 1024 / 1024:.1f} MB of HTML")
+
+    mismatches = sum(parse_data(page) != parse_data_soup(page) for page in pages)
+    print(f"Pages where the parsers disagree: {mismatches}")
+
+    print(f"{'parser':<30}{'rows':>10}{'rows/sec':>14}{'MB/sec':>10}{'peak memory':>14}")
+    for name, function in PARSERS.items():
+        seconds, rows, peak = measure(function, pages, args.repeat)
+        print(f"{name:<30}{rows:>10}{rows / seconds:>14,.0f}{size / seconds / 1024 / 1024:>10.1f}"
+              f"{peak / 1024 / 1024:>12.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Runs the scrape pipeline against the local stand-in server (standin_server) and reports
+issuers/sec, rows/sec and request latency percentiles per stage:
+
+    filter_1          issuer list from the symbol history page
+    refresh_issuers   F3 backfill: plan, fetch, parse, archive and store every window
+    fetch_documents   SEINet documents and PDF attachments (needs the fundamental
+                      analysis dependencies: textblob, pdfplumber, playwright)
+
+Nothing touches the real sites or database: the stand-in is started on a free port and
+the run works in a scratch directory with an empty database, page archive and CSVs.
+
+Run from the repository root:
+    python -m Domasna_4.analysis.benchmarks.scrape_benchmark --issuers 50 --years 5 --latency-ms 40
+"""
+import argparse
+import asyncio
+import csv
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ANALYSIS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else 0.0
+
+
+def report(stage, issuers, rows, seconds, client):
+    latencies = sorted(client.latencies) if client else []
+    counters = client.counters if client else {}
+    print(f"{stage:<17}{issuers:>8}{rows:>10}{seconds:>9.2f}{issuers / seconds:>11.1f}{rows / seconds:>11.0f}"
+          f"{counters.get('requests', 1):>9}{counters.get('retries', 0):>8}{counters.get('failures', 0):>6}"
+          + "".join(f"{percentile(latencies, p) * 1000:>8.0f}" for p in (50, 95, 99))
+          + f"{(latencies[-1] if latencies else 0) * 1000:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=3, help='history to backfill per issuer')
+    parser.add_argument('--max-concurrent', type=int, default=20, help='HttpClient max_concurrent')
+    parser.add_argument('--per-host', type=int, default=8, help='HttpClient per_host')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory')
+    # The server options live in standin_server, which can't be imported yet (see below)
+    parser.add_argument('--issuers', type=int, default=50, help='issuers listed by the stand-in')
+    args, server_argv = parser.parse_known_args()
+
+    # The scrapers read their base URLs and the database path when imported, so the
+    # environment has to be in place before any Domasna_4 module is loaded
+    scratch = tempfile.mkdtemp(prefix='scrape_benchmark_')
+    work_dir = os.path.join(scratch, 'work')  # filter_1 and init_createDB use ../symbols.csv
+    os.makedirs(work_dir)
+    base_url = f"http://127.0.0.1:{free_port()}"
+    os.environ.update(MSE_BASE_URL=base_url, SEINET_BASE_URL=base_url, SEINET_API_URL=base_url,
+                      STOCK_DATA_DB=os.path.join(scratch, 'stock_data.db'))
+
+    from Domasna_4.analysis.benchmarks.standin_server import add_server_arguments, server_from_arguments
+    server_parser = argparse.ArgumentParser()
+    add_server_arguments(server_parser)
+    server_args = server_parser.parse_args(server_argv + ['--issuers', str(args.issuers)])
+    server = server_from_arguments(server_args)
+    server.start_in_thread(port=int(base_url.rsplit(':', 1)[1]))
+
+    from Domasna_4.analysis.DB import init_createDB
+    from Domasna_4.analysis.async_db import AsyncDB
+    from Domasna_4.analysis.filters.F1 import filter_1
+    from Domasna_4.analysis.filters.F3 import refresh_issuers
+    from Domasna_4.analysis.http_client import HttpClient
+    from Domasna_4.analysis.page_archive import PageArchive
+
+    os.chdir(work_dir)
+    try:
+        print(f"Stand-in at {base_url}, scratch directory {scratch}")
+        print(f"{'stage':<17}{'issuers':>8}{'rows':>10}{'seconds':>9}{'issuers/s':>11}{'rows/s':>11}"
+              f"{'requests':>9}{'retries':>8}{'fails':>6}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}")
+
+        started = time.perf_counter()
+        issuers = filter_1()
+        report('filter_1', len(issuers), 0, time.perf_counter() - started, None)
+
+        init_createDB()
+        end_date = datetime.now().strftime('%m/%d/%Y')
+        default_start = (datetime.now() - timedelta(days=365 * args.years)).strftime('%m/%d/%Y')
+
+        async def backfill():
+            async with HttpClient(max_concurrent=args.max_concurrent, per_host=args.per_host) as client:
+                updated, totals = await refresh_issuers(issuers, end_date, default_start,
+                                                        archive=PageArchive(os.path.join(scratch, 'page_archive')),
+                                                        client=client)
+            return client, updated, totals
+
+        started = time.perf_counter()
+        client, updated, totals = asyncio.run(backfill())
+        report('refresh_issuers', len(updated), totals['inserted'] + totals['skipped'],
+               time.perf_counter() - started, client)
+
+        # fundamental_analysis reads issuers.csv from the working directory when imported
+        issuer_ids = [str(number) for number in range(1, args.issuers + 2)]
+        with open('issuers.csv', 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Issuer ID', 'Issuer Name'])
+            writer.writerows([issuer_id, f"Issuer {issuer_id}"] for issuer_id in issuer_ids)
+        try:
+            sys.path.insert(0, os.path.join(ANALYSIS_DIR, 'fundamental_analysis_service'))
+            import fundamental_analysis
+        except ImportError as e:
+            print(f"{'fetch_documents':<17}skipped, fundamental analysis dependencies missing ({e})")
+        else:
+            async def documents():
+                async with HttpClient(max_concurrent=args.max_concurrent, per_host=args.per_host) as client, \
+                        AsyncDB() as db:
+                    await fundamental_analysis.fetch_all_issuer_documents(client, db, fundamental_analysis.issuer_ids)
+                return client
+
+            started = time.perf_counter()
+            fundamental_analysis.setup_database()
+            client = asyncio.run(documents())
+            ids = len(fundamental_analysis.issuer_ids)
+            report('fetch_documents', ids, ids * server_args.documents, time.perf_counter() - started, client)
+
+        print(f"Stand-in: {server.stats}")
+    finally:
+        server.stop()
+        os.chdir(ANALYSIS_DIR)
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Local stand-in for mse.mk and SEINet, so the scrapers can be load-tested offline.
+
+Serves, on one port:
+    GET  /page.aspx/stats/symbolhistory/{code}     mse.mk history page (issuer list + #resultsTable)
+    GET  /search/{issuer_id}                        SEINet issuer search page
+    POST /public/documents                          SEINet documents API (JSON)
+    GET  /public/documents/attachment/{id}          PDF attachment
+
+History pages are generated (a random walk per issuer) or, with --archive, served from
+a page_archive directory of recorded responses where one matches the request. Latency,
+error and throttling rates and page/PDF sizes are configurable. Point the scrapers at it
+with MSE_BASE_URL, SEINET_BASE_URL and SEINET_API_URL (see http_client), or use
+scrape_benchmark, which does that itself.
+
+Run from the repository root:
+    python -m Domasna_4.analysis.benchmarks.standin_server --port 8080 --latency-ms 50 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import string
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from aiohttp import web
+
+from Domasna_4.analysis.benchmarks.parse_benchmark import render_page
+from Domasna_4.analysis.page_archive import PageArchive
+
+SENTENCES = (
+    "The company reported strong growth and a record profit for the period.",
+    "Revenue increased and the board proposed a higher dividend.",
+    "The issuer recorded a loss due to weak demand and higher costs.",
+    "Sales declined and the outlook remains uncertain.",
+    "The general assembly adopted the annual financial statements.",
+)
+
+
+def issuer_codes(count):
+    """Letter-only codes (AAAA, AAAB, ...), which filter_1 accepts."""
+    return [''.join(code) for code in itertools.islice(itertools.product(string.ascii_uppercase, repeat=4), count)]
+
+
+def make_pdf(text_lines):
+    """A minimal single-page PDF with the given lines of text."""
+    def escape(line):
+        return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    content = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in text_lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content.encode('latin-1'))} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf.encode('latin-1')))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf.encode('latin-1'))
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode('latin-1')
+
+
+class StandinServer:
+    """
+    The stand-in application and its fault/size settings.
+
+        server = StandinServer(issuers=50, latency_ms=40, error_rate=0.01)
+        server.start_in_thread(port=8080)
+        ...
+        server.stop()
+    """
+
+    def __init__(self, issuers=50, latency_ms=0.0, jitter_ms=0.0, slow_rate=0.0, error_rate=0.0,
+                 throttle_rate=0.0, trade_rate=0.8, page_kb=0, documents=3, pdf_lines=40,
+                 archive=None, seed=None):
+        self.issuers = issuer_codes(issuers)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate  # Share of requests that take ten times as long
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.trade_rate = trade_rate  # Chance an issuer traded on a given weekday
+        self.documents = documents
+        self.pdf_lines = pdf_lines
+        self.archive = PageArchive(archive) if archive else None
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "bytes": 0}
+        self._loop = None
+        self._runner = None
+
+        # The issuer dropdown filter_1 reads, plus filler links up to page_kb of markup
+        options = "".join(f'<option value="{code}">{code}</option>' for code in self.issuers + ['MKD1', 'E2025'])
+        navigation = f'<select id="Code" name="Code">{options}</select>'
+        filler = '<li class="nav-item"><a href="/mk/page/0">Линк &amp; повеќе</a></li>'
+        self.navigation = navigation + filler * max(0, page_kb * 1024 // len(filler.encode('utf-8')))
+
+    async def _inject(self):
+        """Waits the configured latency; returns an error response to send instead, if any."""
+        self.stats["requests"] += 1
+        delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if self.random.random() < self.slow_rate:
+            delay *= 10
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=500, text="Internal Server Error")
+        if roll < self.error_rate + self.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, headers={'Retry-After': '1'}, text="Too Many Requests")
+        return None
+
+    def _respond(self, **kwargs):
+        response = web.Response(**kwargs)
+        self.stats["bytes"] += len(response.body or b'')
+        return response
+
+    def history_rows(self, code, start, end):
+        """StockData-like rows (newest first) of a synthetic issuer between two dates."""
+        walk = random.Random(f"{code}:{start}:{end}")
+        price = walk.uniform(100, 30000)
+        rows = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5 and walk.random() < self.trade_rate:
+                change = walk.uniform(-3, 3)
+                price = max(1.0, price * (1 + change / 100))
+                volume = walk.randint(1, 5000)
+                turnover = price * volume
+                rows.append((code, day.isoformat(), price, price * 1.01, price * 0.99, price, change,
+                             volume, turnover, turnover))
+            day += timedelta(days=1)
+        rows.reverse()
+        return rows
+
+    async def symbol_history(self, request):
+        error = await self._inject()
+        if error:
+            return error
+        code = request.match_info['code']
+        today = date.today()
+        from_date = request.query.get('FromDate', (today - timedelta(days=364)).strftime('%m/%d/%Y'))
+        to_date = request.query.get('ToDate', today.strftime('%m/%d/%Y'))
+        page = self.archive.get(code, from_date, to_date) if self.archive else None
+        if page is None:
+            start = datetime.strptime(from_date, '%m/%d/%Y').date()
+            end = datetime.strptime(to_date, '%m/%d/%Y').date()
+            page = render_page(code, self.history_rows(code, start, end), navigation=self.navigation)
+        return self._respond(text=page, content_type='text/html')
+
+    async def search(self, request):
+        error = await self._inject()
+        if error:
+            return error
+        return self._respond(text=f"<html><body><div id=\"root\">{request.match_info['issuer_id']}</div></body></html>",
+                             content_type='text/html')
+
+    async def documents_api(self, request):
+        error = await self._inject()
+        if error:
+            return error
+        payload = await request.json()
+        issuer_id = int(payload.get('issuerId', 0))
+        documents = []
+        for number in range(self.documents):
+            attachment_id = issuer_id * 1000 + number
+            documents.append({
+                "publishedDate": datetime.now().isoformat(timespec='seconds'),
+                "attachments": [
+                    {"attachmentId": attachment_id, "fileName": f"report-{attachment_id}.pdf"},
+                    {"attachmentId": attachment_id + 500, "fileName": f"annex-{attachment_id}.docx"},
+                ],
+            })
+        response = web.json_response({"data": documents})
+        self.stats["bytes"] += len(response.body)
+        return response
+
+    async def attachment(self, request):
+        error = await self._inject()
+        if error:
+            return error
+        lines = random.Random(request.match_info['attachment_id']).choices(SENTENCES, k=self.pdf_lines)
+        return self._respond(body=make_pdf(lines), content_type='application/pdf')
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/page.aspx/stats/symbolhistory/{code}', self.symbol_history)
+        app.router.add_get('/search/{issuer_id}', self.search)
+        app.router.add_post('/public/documents', self.documents_api)
+        app.router.add_get('/public/documents/attachment/{attachment_id}', self.attachment)
+        return app
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    def start_in_thread(self, host='127.0.0.1', port=8080):
+        """Serves from a background thread with its own event loop; returns the base URL."""
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=serve, name='standin-server', daemon=True).start()
+        started.wait()
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def add_server_arguments(parser):
+    """Fault and size options, shared with scrape_benchmark."""
+    parser.add_argument('--issuers', type=int, default=50, help='issuers listed by the stand-in')
+    parser.add_argument('--latency-ms', type=float, default=20, help='mean response latency')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='standard deviation of the latency')
+    parser.add_argument('--slow-rate', type=float, default=0.01, help='share of requests 10x slower')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--trade-rate', type=float, default=0.8, help='chance an issuer trades on a weekday')
+    parser.add_argument('--page-kb', type=int, default=20, help='extra markup per history page')
+    parser.add_argument('--documents', type=int, default=3, help='SEINet documents per issuer')
+    parser.add_argument('--pdf-lines', type=int, default=40, help='lines of text per PDF attachment')
+    parser.add_argument('--archive', help='page_archive directory to serve recorded history pages from')
+    parser.add_argument('--seed', type=int, help='seed for latency and fault injection')
+
+
+def server_from_arguments(args):
+    return StandinServer(issuers=args.issuers, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         slow_rate=args.slow_rate, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                         trade_rate=args.trade_rate, page_kb=args.page_kb, documents=args.documents,
+                         pdf_lines=args.pdf_lines, archive=args.archive, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_arguments(args)
+    base_url = server.start_in_thread(args.host, args.port)
+    print(f"Serving mse.mk and SEINet stand-ins on {base_url} (Ctrl+C to stop)")
+    print(f"    MSE_BASE_URL={base_url} SEINET_BASE_URL={base_url} SEINET_API_URL={base_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(server.stats)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
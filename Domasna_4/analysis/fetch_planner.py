@@ -0,0 +1,180 @@
+"""
+Plans the mse.mk history requests of a refresh.
+
+A naive refresh asks for every issuer from its watermark up to today. The planner only
+asks for windows that can hold new rows: a Macedonian Stock Exchange trading calendar
+(weekends, public holidays, and what StockData shows about past days) skips windows
+without a trading session and trims the others to the sessions they cover, and issuers
+that haven't traded for a while are checked less often. Skipped issuers keep their
+watermark, so nothing is lost: their rows come with a later refresh.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+from Domasna_4.analysis.DB import trading_days
+
+# mse.mk returns at most a year of history per request
+HISTORY_WINDOW_DAYS = 364
+
+# Public holidays the exchange is closed on, as (month, day); one falling on a Sunday moves to Monday
+MSE_FIXED_HOLIDAYS = ((1, 1), (1, 7), (5, 1), (5, 24), (8, 2), (9, 8), (10, 11), (10, 23), (12, 8))
+# Religious holidays that aren't moved when they fall on a weekend
+MSE_UNMOVED_HOLIDAYS = ((1, 6), (1, 19), (8, 28))
+# Days around Orthodox Easter: Good Friday, Easter Monday and the Friday before Pentecost
+ORTHODOX_EASTER_OFFSETS = (-2, 1, 47)
+# Ramazan Bajram follows the lunar calendar; years not listed here are planned as trading days
+EID_AL_FITR = {2015: (7, 17), 2016: (7, 5), 2017: (6, 25), 2018: (6, 15), 2019: (6, 4), 2020: (5, 24),
+               2021: (5, 13), 2022: (5, 2), 2023: (4, 21), 2024: (4, 10), 2025: (3, 30), 2026: (3, 20)}
+
+# An issuer without trades for this many sessions is dormant...
+DORMANT_AFTER_SESSIONS = 20
+# ...and is fetched once a quarter of its idle sessions, at most this many, have passed
+MAX_DORMANT_DELAY_SESSIONS = 20
+
+
+def plan_windows(start_date, end_date):
+    """Splits [start_date, end_date] (MM/DD/YYYY) into the request windows mse.mk accepts."""
+    current_start = datetime.strptime(start_date, '%m/%d/%Y')
+    final_end = datetime.strptime(end_date, '%m/%d/%Y')
+    windows = []
+    while current_start <= final_end:
+        current_end = min(current_start + timedelta(days=HISTORY_WINDOW_DAYS), final_end)
+        windows.append((current_start.strftime('%m/%d/%Y'), current_end.strftime('%m/%d/%Y')))
+        current_start = current_end + timedelta(days=1)  # Move to the next period
+    return windows
+
+
+def pending_windows(start_date, end_date, stored=()):
+    """
+    The windows of [start_date, end_date] (MM/DD/YYYY) still to fetch.
+
+    stored holds (from_date, to_date) ISO ranges already in the database (the fetch
+    checkpoints of an interrupted refresh); only the gaps between them are split into
+    windows, so a resumed refresh doesn't ask for them again.
+    """
+    current = datetime.strptime(start_date, '%m/%d/%Y').date()
+    final_end = datetime.strptime(end_date, '%m/%d/%Y').date()
+    windows = []
+    for from_date, to_date in sorted(stored):
+        from_date, to_date = date.fromisoformat(from_date), date.fromisoformat(to_date)
+        if to_date < current:
+            continue
+        if from_date > current:
+            gap_end = min(from_date - timedelta(days=1), final_end)
+            windows += plan_windows(current.strftime('%m/%d/%Y'), gap_end.strftime('%m/%d/%Y'))
+        current = max(current, to_date + timedelta(days=1))
+        if current > final_end:
+            return windows
+    return windows + plan_windows(current.strftime('%m/%d/%Y'), end_date)
+
+
+def orthodox_easter(year):
+    """Orthodox Easter Sunday (Gregorian date), valid for 1900-2099."""
+    a, b, c = year % 4, year % 7, year % 19
+    d = (19 * c + 15) % 30
+    e = (2 * a + 4 * b - d + 34) % 7
+    month, day = divmod(d + e + 114, 31)
+    return date(year, month, day + 1) + timedelta(days=13)  # Julian to Gregorian
+
+
+def mse_holidays(year):
+    """Weekdays of the year the exchange is closed by its holiday rules."""
+    holidays = set()
+    fixed = [date(year, month, day) for month, day in MSE_FIXED_HOLIDAYS]
+    if year in EID_AL_FITR:
+        fixed.append(date(year, *EID_AL_FITR[year]))
+    for day in fixed:
+        holidays.add(day + timedelta(days=1) if day.weekday() == 6 else day)
+    holidays.update(date(year, month, day) for month, day in MSE_UNMOVED_HOLIDAYS)
+    easter = orthodox_easter(year)
+    holidays.update(easter + timedelta(days=offset) for offset in ORTHODOX_EASTER_OFFSETS)
+    # No trading on the last weekday of the year
+    last_day = date(year, 12, 31)
+    holidays.add(last_day - timedelta(days=max(0, last_day.weekday() - 4)))
+    return {day for day in holidays if day.weekday() < 5}
+
+
+class TradingCalendar:
+    """
+    Tells which days the Macedonian Stock Exchange trades on.
+
+    Days inside the observed range are known from StockData (a day with rows traded, one
+    without didn't); later and earlier days follow the weekend and holiday rules.
+
+        calendar = TradingCalendar.load(date(2024, 1, 1), date.today())
+        calendar.sessions(date(2024, 12, 20), date(2025, 1, 10))
+    """
+
+    def __init__(self, observed=()):
+        self.observed = {date.fromisoformat(day) for day in observed}
+        self.observed_range = (min(self.observed), max(self.observed)) if self.observed else None
+        self._holidays = {}
+
+    @classmethod
+    def load(cls, from_date, to_date):
+        return cls(trading_days(from_date.isoformat(), to_date.isoformat()))
+
+    def is_trading_day(self, day):
+        if day in self.observed:
+            return True
+        if self.observed_range and self.observed_range[0] <= day <= self.observed_range[1]:
+            return False
+        if day.year not in self._holidays:
+            self._holidays[day.year] = mse_holidays(day.year)
+        return day.weekday() < 5 and day not in self._holidays[day.year]
+
+    def sessions(self, from_date, to_date):
+        """Trading days between two dates (inclusive), in order."""
+        days = []
+        day = from_date
+        while day <= to_date:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+
+def plan_refresh(watermarks, last_trades, end_date, default_start, calendar=None):
+    """
+    Computes the minimal requests to bring every issuer up to end_date.
+
+    watermarks maps issuers to their last fetched date (MM/DD/YYYY, or None), last_trades
+    to the ISO date of their latest row. Returns (plan, fetch_end, report): plan maps
+    each issuer to fetch to its first session to request (MM/DD/YYYY), fetch_end is the
+    last session up to end_date (None if there is nothing to fetch), and report counts
+    the requests a naive refresh would make, the planned ones and why issuers were skipped.
+    """
+    parse = lambda value: datetime.strptime(value, '%m/%d/%Y').date()
+    end = parse(end_date)
+    starts = {issuer: parse(watermark or default_start)
+              for issuer, watermark in watermarks.items() if watermark != end_date}
+    report = {"issuers": len(watermarks), "up_to_date": len(watermarks) - len(starts),
+              "no_session": 0, "dormant": 0, "naive_requests": 0, "requests": 0, "requests_saved": 0}
+    if not starts:
+        return {}, None, report
+
+    # One list of sessions covers every issuer's pending and idle days
+    last_trades = {issuer: date.fromisoformat(day) for issuer, day in last_trades.items() if day}
+    first_day = min([parse(default_start), *starts.values(), *last_trades.values()])
+    calendar = calendar or TradingCalendar.load(first_day, end)
+    sessions = calendar.sessions(first_day, end)
+    fetch_end = sessions[-1].strftime('%m/%d/%Y') if sessions else None
+
+    plan = {}
+    for issuer, start in starts.items():
+        report["naive_requests"] += len(plan_windows(start.strftime('%m/%d/%Y'), end_date))
+        first_pending = bisect_left(sessions, start)
+        pending = len(sessions) - first_pending
+        if not pending:
+            report["no_session"] += 1  # Only weekends and holidays since the last fetch
+            continue
+        last_trade = last_trades.get(issuer)
+        idle = first_pending - (bisect_right(sessions, last_trade) if last_trade else 0)
+        if idle >= DORMANT_AFTER_SESSIONS and pending < min(idle // 4, MAX_DORMANT_DELAY_SESSIONS):
+            report["dormant"] += 1
+            continue
+        plan[issuer] = sessions[first_pending].strftime('%m/%d/%Y')
+        report["requests"] += len(plan_windows(plan[issuer], fetch_end))
+
+    report["requests_saved"] = report["naive_requests"] - report["requests"]
+    return plan, fetch_end, report
@@ -1,9 +1,10 @@
 # Koristenje na BeautifulSoup deka za static scrapping e pokorisno i pobrzo (nema refreshing)
 
-import requests
 from bs4 import BeautifulSoup
 import csv
 
+from Domasna_4.analysis.http_client import get_sync, MSE_BASE_URL
+
 
 # Proverka dali e obvrznik ili sodrzi brojka
 def is_valid_issuer_code(s):
@@ -14,7 +15,8 @@ def is_valid_issuer_code(s):
 
 
 def filter_1():
-    response = requests.get("https://www.mse.mk/page.aspx/stats/symbolhistory/ADIN")
+    # Retried with backoff; FetchError if mse.mk stays unreachable
+    response = get_sync(f"{MSE_BASE_URL}/page.aspx/stats/symbolhistory/ADIN")
     print(response.status_code)
 
     response.raise_for_status()
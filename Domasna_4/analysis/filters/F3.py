@@ -1,51 +1,295 @@
-import aiohttp
 import asyncio
-from datetime import datetime, timedelta
+import html
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from bs4 import BeautifulSoup
 import csv
 
-from Domasna_4.analysis.DB import update_last_date, insert_stock_data
+from Domasna_4.analysis.DB import last_trade_dates, fetch_checkpoints
+from Domasna_4.analysis.async_db import AsyncDB
+from Domasna_4.analysis.page_archive import PageArchive
+from Domasna_4.analysis.fetch_planner import pending_windows, plan_refresh
+from Domasna_4.analysis.http_client import FetchError, HttpClient, BREAKER_RESET_TIMEOUT, MSE_BASE_URL
 
-async def fetch_data_for_dates(session, issuer_code, start_date, end_date):
-    """Fetch data for a specific issuer between start and end dates in 365-day increments."""
-    url = f"https://www.mse.mk/page.aspx/stats/symbolhistory/{issuer_code}"
+# Limits of the history fetcher: requests in flight overall, and connections to one host
+MAX_CONCURRENT_REQUESTS = 20
+MAX_CONNECTIONS_PER_HOST = 8
+# Extra passes over an issuer's failed windows before its watermark is held back
+FAILED_WINDOW_ROUNDS = 2
+FAILED_WINDOW_DELAY = BREAKER_RESET_TIMEOUT
+# Ingest pipeline: pages waiting to be parsed, parsed windows waiting to be written, parser threads
+PAGE_QUEUE_SIZE = 32
+PARSED_QUEUE_SIZE = 32
+PARSE_WORKERS = 2
+# Rows the writer gathers into one bulk_ingest transaction
+WRITE_BATCH_ROWS = 5000
+
+# Scanner used by parse_data: only the #resultsTable part of the page is looked at
+RESULTS_TABLE_RE = re.compile(r'<table\b[^>]*\bid\s*=\s*["\']?resultsTable["\'\s>]', re.IGNORECASE)
+TABLE_END_RE = re.compile(r'</table\s*>', re.IGNORECASE)
+ROW_START_RE = re.compile(r'<tr\b[^>]*>', re.IGNORECASE)
+CELL_RE = re.compile(r'<td\b[^>]*>(.*?)(?=<td\b|</tr\s*>|$)', re.IGNORECASE | re.DOTALL)
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+async def fetch_page(client, issuer_code, start_date, end_date):
+    """Fetches the raw history page of an issuer between start and end dates; None on failure."""
+    url = f"{MSE_BASE_URL}/page.aspx/stats/symbolhistory/{issuer_code}"
     params = {
         'FromDate': start_date,
         'ToDate': end_date
     }
-    async with session.get(url, params=params) as response:
-        if response.status == 200:
-            page_content = await response.text()
-            return parse_data(page_content)
-        else:
-            print(f"Failed to fetch data for {issuer_code}")
-            return None
+    # Timeouts, throttling and 5xx are retried by the client; FetchError once it gives up
+    status, page_content = await client.get(url, params=params)
+    if status == 200:
+        return page_content
+    else:
+        print(f"Failed to fetch data for {issuer_code}: HTTP {status}")
+        return None
+
+
+async def fetch_window(client, issuer_code, start_date, end_date, archive=None):
+    """
+    Fetches one window's page through the shared HTTP policy; None if the request failed.
+
+    With an archive, immutable windows are read from it without a request, and every
+    fetched page is stored in it. Archive I/O runs on the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    if archive is not None:
+        page_content = await loop.run_in_executor(None, archive.get, issuer_code, start_date, end_date)
+        if page_content is not None:
+            return page_content
+
+    try:
+        page_content = await fetch_page(client, issuer_code, start_date, end_date)
+    except FetchError as e:
+        print(f"Failed to fetch data for {issuer_code} ({start_date} - {end_date}): {e}")
+        return None
+    if page_content is not None and archive is not None:
+        await loop.run_in_executor(None, archive.put, issuer_code, start_date, end_date, page_content)
+    return page_content
+
+
+async def ingest_history(plan, end_date, db, archive=None, stored=None, final_watermark=None, client=None,
+                         max_concurrent=MAX_CONCURRENT_REQUESTS, per_host=MAX_CONNECTIONS_PER_HOST):
+    """
+    Streams the history of many issuers from mse.mk into StockData.
+
+    plan maps each issuer to the date (MM/DD/YYYY) to fetch from, and stored (as returned
+    by fetch_checkpoints) to the windows it already has, which aren't fetched again.
+    Three stages run at once, joined by bounded queues, so a backfill of any length only
+    holds a few pages and one write batch in memory:
+
+        fetch   one task per request the client allows downloads (issuer, window) jobs,
+                through archive (a PageArchive) when one is given
+        parse   PARSE_WORKERS tasks turn pages into StockData rows on a thread pool
+        write   one task commits about WRITE_BATCH_ROWS rows at a time with
+                db.bulk_ingest, with a checkpoint for every window in the batch
+
+    An issuer's watermark moves with each batch to the start of its first window not
+    stored yet (final_watermark, default end_date, once all are), so an interrupted run
+    resumes from there and skips the checkpointed windows past it. Failed windows get
+    FAILED_WINDOW_ROUNDS more tries, FAILED_WINDOW_DELAY seconds apart. Returns the
+    issuers that got rows or completed, and the inserted/skipped/failed window totals.
+    """
+    if client is None:
+        async with HttpClient(max_concurrent=max_concurrent, per_host=per_host) as client:
+            return await ingest_history(plan, end_date, db, archive, stored, final_watermark, client)
+
+    stored = stored or {}
+    final_watermark = final_watermark or end_date
+    windows = {issuer: pending_windows(start, end_date, stored.get(issuer, ())) for issuer, start in plan.items()}
+    done = {issuer: set() for issuer in windows}
+    written_watermarks = {}
+    totals = {"inserted": 0, "skipped": 0, "failed_windows": 0}
+
+    def watermark(issuer):
+        """Start of the issuer's first window that isn't stored yet."""
+        for window in windows[issuer]:
+            if window not in done[issuer]:
+                return window[0]
+        return final_watermark
+
+    async def write(batch):
+        rows = {}
+        for issuer, window, window_rows in batch:
+            rows.setdefault(issuer, []).extend(window_rows)
+            done[issuer].add(window)
+        issuer_data = []
+        for issuer, issuer_rows in rows.items():
+            last_date = watermark(issuer)
+            moved = written_watermarks.get(issuer) != last_date
+            issuer_data.append((issuer, issuer_rows, last_date if moved else None))
+            written_watermarks[issuer] = last_date
+        result = await db.bulk_ingest(issuer_data, [(issuer, *window) for issuer, window, _ in batch])
+        totals["inserted"] += result["inserted"]
+        totals["skipped"] += result["skipped"]
+
+    jobs = asyncio.Queue()
+    pages = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+    parsed = asyncio.Queue(maxsize=PARSED_QUEUE_SIZE)
+    failed = []
+    loop = asyncio.get_running_loop()
+    parse_pool = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='history-parser')
+
+    async def fetch_worker():
+        while True:
+            issuer, window = await jobs.get()
+            page_content = await fetch_window(client, issuer, *window, archive)
+            if page_content is None:
+                failed.append((issuer, window))
+            else:
+                await pages.put((issuer, window, page_content))
+            jobs.task_done()
+
+    async def parse_worker():
+        while True:
+            issuer, window, page_content = await pages.get()
+            try:
+                window_rows = await loop.run_in_executor(parse_pool, parse_window, page_content)
+            except ValueError as e:
+                print(f"Failed to parse data for {issuer} ({window[0]} - {window[1]}): {e}")
+                failed.append((issuer, window))
+            else:
+                await parsed.put((issuer, window, window_rows))
+            pages.task_done()
+
+    async def writer():
+        while True:
+            batch = [await parsed.get()]
+            # Take whatever else is ready, up to a batch, so commits keep up with the fetchers
+            while not parsed.empty() and sum(len(rows) for _, _, rows in batch) < WRITE_BATCH_ROWS:
+                batch.append(parsed.get_nowait())
+            await write(batch)
+            for _ in batch:
+                parsed.task_done()
+
+    workers = [asyncio.ensure_future(worker()) for worker in
+               [fetch_worker] * client.max_concurrent + [parse_worker] * PARSE_WORKERS + [writer]]
+
+    async def drain(queue):
+        # The stages loop forever, so one that finished has failed; raise its error instead of waiting
+        joined = asyncio.ensure_future(queue.join())
+        await asyncio.wait([joined, *workers], return_when=asyncio.FIRST_COMPLETED)
+        for worker in workers:
+            if worker.done():
+                joined.cancel()
+                worker.result()
+
+    try:
+        # Issuers already complete from an earlier run only need their watermark
+        complete = [(issuer, [], final_watermark) for issuer in windows if not windows[issuer]]
+        if complete:
+            await db.bulk_ingest(complete)
+        pending = [(issuer, window) for issuer in windows for window in windows[issuer]]
+        for round_number in range(FAILED_WINDOW_ROUNDS + 1):
+            if round_number:
+                # Give the host (and its circuit breaker) time to recover before asking again
+                print(f"Retrying {len(pending)} failed windows in {FAILED_WINDOW_DELAY:.0f}s")
+                await asyncio.sleep(FAILED_WINDOW_DELAY)
+            for job in pending:
+                jobs.put_nowait(job)
+            await drain(jobs)
+            await drain(pages)
+            pending, failed[:] = list(failed), []
+            if not pending:
+                break
+        await drain(parsed)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        parse_pool.shutdown(wait=False)
 
+    for issuer in sorted({issuer for issuer, _ in pending}):
+        missing = len([window for job_issuer, window in pending if job_issuer == issuer])
+        print(f"{missing} windows for {issuer} failed, keeping its watermark at {watermark(issuer)}")
+    totals["failed_windows"] = len(pending)
+    return [issuer for issuer in windows if done[issuer] or not windows[issuer]], totals
 
-async def filter_3(issuer_code, start_date):
-    """Fetch data for the issuer, ensuring that each request covers a 365-day range."""
-    async with aiohttp.ClientSession() as session:
-        current_start = datetime.strptime(start_date, '%m/%d/%Y')
-        end = datetime.now().strftime('%m/%d/%Y')
-        final_end = datetime.strptime(end, '%m/%d/%Y')
-        all_data = []
 
-        while current_start < final_end:
-            current_end = min(current_start + timedelta(days=364), final_end)
-            fetched_data = await fetch_data_for_dates(
-                session, issuer_code,
-                current_start.strftime('%m/%d/%Y'),
-                current_end.strftime('%m/%d/%Y')
-            )
-            if fetched_data:
-                all_data.extend(fetched_data)
-            current_start = current_end + timedelta(days=1)  # Move to the next period
+async def backfill_issuer(issuer_code, start_date):
+    """
+    Streams the issuer's history since start_date into the database, window by window.
 
-        return all_data
+    Replaces filter_3, which returned the rows instead of storing them. Returns the
+    inserted/skipped/failed_windows totals of ingest_history; read the stored rows back
+    with DB.extract_issuer_rows.
+    """
+    end = datetime.now().strftime('%m/%d/%Y')
+    async with AsyncDB() as db:
+        stored = await db.read(fetch_checkpoints, [issuer_code])
+        _, totals = await ingest_history({issuer_code: start_date}, end, db, stored=stored)
+    return totals
+
+
+async def refresh_issuers(issuers, end_date, default_start="11/10/2014", archive=None, client=None):
+    """
+    Fetches new rows for every issuer whose watermark is behind end_date and stores them.
+
+    fetch_planner.plan_refresh decides which issuers and windows are worth requesting
+    (only trading sessions, dormant issuers less often); the rest keep their watermark.
+    The planned issuers are streamed into the database by ingest_history, which commits
+    rows, window checkpoints and watermarks through AsyncDB as pages arrive, so a refresh
+    that is interrupted or has failed windows picks up where it stopped next time. Raw
+    pages are kept in archive (the default PageArchive if None) for page_archive.replay.
+    Returns the updated issuers and the inserted/skipped row totals with the planner's
+    report. A client (HttpClient) can be passed in to reuse it or read its stats afterwards.
+    """
+    archive = archive or PageArchive()
+    async with AsyncDB() as db:
+        watermarks = await asyncio.gather(*(db.get_last_saved_date(issuer) for issuer in issuers))
+        last_trades = await db.read(last_trade_dates, issuers)
+        plan, fetch_end, report = await db.read(plan_refresh, dict(zip(issuers, watermarks)), last_trades,
+                                                end_date, default_start)
+        print(f"Planned {report['requests']} requests for {len(plan)} issuers, "
+              f"{report['requests_saved']} fewer than refetching every watermark.")
+        updated = []
+        totals = {"inserted": 0, "skipped": 0, "failed_windows": 0}
+        if plan:
+            stored = await db.read(fetch_checkpoints, list(plan))
+            resumed = sum(len(windows) for windows in stored.values())
+            if resumed:
+                print(f"Resuming: {resumed} windows are already stored and won't be fetched again.")
+            updated, totals = await ingest_history(plan, fetch_end, db, archive, stored,
+                                                   final_watermark=end_date, client=client)
+
+    return updated, {**totals, "plan": report}
+
+
+def parse_window(page_content):
+    """Parses a history page into normalized StockData rows (parse_data, then normalize_row)."""
+    return [normalize_row(row) for row in parse_data(page_content)]
 
 
 def parse_data(page_content):
-    """Parses HTML content to extract table data."""
+    """
+    Parses the #resultsTable rows of an mse.mk history page.
+
+    Returns the same rows as parse_data_soup, but only scans the results table with a few
+    regular expressions instead of building a tree of the whole page.
+    """
+    start = RESULTS_TABLE_RE.search(page_content)
+    if not start:
+        return []
+    end = TABLE_END_RE.search(page_content, start.end())
+    table = COMMENT_RE.sub('', page_content[start.end():end.start() if end else len(page_content)])
+
+    data = []
+    row_starts = [match.end() for match in ROW_START_RE.finditer(table)]
+    # A row runs until the next one starts, whether or not </tr> is there
+    for row_start, row_end in zip(row_starts[1:], row_starts[2:] + [len(table)]):  # Skip header row
+        cols = [html.unescape(TAG_RE.sub('', cell)).strip() for cell in CELL_RE.findall(table, row_start, row_end)]
+        if len(cols) > 6 and cols[6] != '0':  # Check volume is not zero
+            data.append(cols)
+    return data
+
+
+def parse_data_soup(page_content):
+    """Parses HTML content to extract table data (the BeautifulSoup reference for parse_data)."""
     soup = BeautifulSoup(page_content, 'html.parser')
     table = soup.find('table', id='resultsTable')  # Replace with the actual ID
 
@@ -79,6 +323,30 @@ def reformat_number(value):
         return value
 
 
+def parse_number(value):
+    """Parses a number as shown on mse.mk ('1,234.56') into a float, or None if empty."""
+    try:
+        return float(value.replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def normalize_row(row):
+    """Converts a scraped table row into the typed StockData layout (ISO date, numbers)."""
+    volume = parse_number(row[6])
+    return [
+        datetime.strptime(row[0], '%m/%d/%Y').strftime('%Y-%m-%d'),  # Date
+        parse_number(row[1]),  # LastTradePrice
+        parse_number(row[2]),  # Max
+        parse_number(row[3]),  # Min
+        parse_number(row[4]),  # AvgPrice
+        parse_number(row[5]),  # PercentageChange
+        int(volume) if volume is not None else None,  # Volume
+        parse_number(row[7]),  # TurnoverInBEST
+        parse_number(row[8])  # TotalTurnover
+    ]
+
+
 # def save_all_to_csv(results, issuers):
 #     """Saves all issuer data in one CSV file."""
 #     with open("all_issuers_data.csv", "w", newline="") as csvfile:
@@ -93,28 +361,3 @@ def reformat_number(value):
 #                                                 in enumerate(row)]
 #                     writer.writerow(formatted_row)  # Include issuer code in each row
 #     print("Data saved to all_issuers_data.csv")
-
-def save_to_database(results, issuers):
-    """Saves all issuer data to the database."""
-    for issuer, data in zip(issuers, results):
-        if data:
-            formatted_data = []
-            for row in data:
-                # Date and symbol remain as strings, others are converted to numbers
-                formatted_row = [
-                    row[0],  # Date
-                    reformat_number(row[1]),  # LastTradePrice
-                    reformat_number(row[2]),  # Max
-                    reformat_number(row[3]),  # Min
-                    reformat_number(row[4]),  # AvgPrice
-                    reformat_number(row[5]),  # PercentageChange
-                    str(reformat_number(row[6])),  # Volume
-                    str(reformat_number(row[7])),  # TurnoverInBEST
-                    str(reformat_number(row[8]))  # TotalTurnover
-                ]
-                formatted_data.append(formatted_row)
-            # Insert formatted data into the database
-            insert_stock_data(issuer, formatted_data)
-
-
-
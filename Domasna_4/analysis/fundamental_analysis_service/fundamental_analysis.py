@@ -1,6 +1,5 @@
 import asyncio
 from datetime import datetime, timedelta
-import aiohttp
 import sqlite3
 from collections import defaultdict, Counter
 from textblob import TextBlob
@@ -10,7 +9,10 @@ import os
 from playwright.sync_api import sync_playwright
 import csv
 
-from Domasna_4.analysis.DB import DatabaseConnection
+from Domasna_4.analysis.DB import DatabaseConnection, ALL_INFO_INDEXES, publish_read_snapshot, \
+    RECOMMENDATION_COUNTS_TABLE_SQL, UPDATE_RECOMMENDATION_COUNTS_QUERY, rebuild_recommendation_counts
+from Domasna_4.analysis.async_db import AsyncDB
+from Domasna_4.analysis.http_client import HttpClient, SEINET_API_URL, SEINET_BASE_URL
 
 
 def save_issuers_to_csv(issuers, file_name='issuers.csv'):
@@ -206,9 +208,14 @@ def setup_database():
                 current_recommendation TEXT
             )
         ''')
+        cursor.execute(RECOMMENDATION_COUNTS_TABLE_SQL)
+        for statement in ALL_INFO_INDEXES:
+            cursor.execute(statement)
         db.commit()
     finally:
         cursor.close()
+    # Fill the counts for sentiment rows stored before the table existed
+    rebuild_recommendation_counts(only_if_empty=True)
 
 def save_to_database(table, data):
     db = DatabaseConnection().get_connection()
@@ -216,6 +223,8 @@ def save_to_database(table, data):
     try:
         if table == 'all_info':
             cursor.execute('INSERT INTO all_info (issuer, recommendation, last_scraped_date) VALUES (?, ?, ?)', data)
+            # Same transaction, so the counts never disagree with all_info
+            cursor.execute(UPDATE_RECOMMENDATION_COUNTS_QUERY, {'issuer': data[0], 'recommendation': data[1]})
         elif table == 'recommendations':
             cursor.execute('INSERT OR REPLACE INTO recommendations (issuer, current_recommendation) VALUES (?, ?)', data)
         db.commit()
@@ -223,103 +232,122 @@ def save_to_database(table, data):
         cursor.close()
 
 
-async def fetch_attachment(session, attachment_id, issuer, last_scraped_date, file_name, attachment_ids_map):
-    base_url = "https://api.seinet.com.mk/public/documents/attachment/"
+async def fetch_attachment(client, db, attachment_id, issuer, last_scraped_date, file_name, attachment_ids_map):
+    """Stores the attachment's recommendation; returns False if it couldn't be downloaded."""
+    base_url = f"{SEINET_API_URL}/public/documents/attachment/"
     url = f"{base_url}{attachment_id}"  # Construct the URL for the specific attachment
 
     # Check if the file is a PDF
     if not file_name.lower().endswith('.pdf'):
         # print(f"Skipping non-PDF file: {file_name}")
-        return
+        return True
 
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                with io.BytesIO(await response.read()) as file:
-                    with pdfplumber.open(file) as pdf:
-                        all_text = ""
-                        for page in pdf.pages:
-                            all_text += page.extract_text()
-
-                        if not all_text.strip():
-                            return
-
-                        # Define the recommendation based on sentiment
-                        sentiment = TextBlob(all_text).sentiment.polarity
-                        if sentiment > 0:
-                            recommendation = actions["positive"]
-                        elif sentiment < 0:
-                            recommendation = actions["negative"]
-                        else:
-                            recommendation = actions["neutral"]
-
-                        # save_to_database('all_info', (issuer, recommendation, last_scraped_date))
-                        # update_last_scraped_date(issuer, last_scraped_date)
-
-                        # Add attachment ID to the map for the issuer
-                        if issuer not in attachment_ids_map:
-                            attachment_ids_map[issuer] = []
-                        attachment_ids_map[issuer].append(attachment_id)
-            else:
-                print(f"Failed to fetch attachment {attachment_id}: {response.status}")
+        status, content = await client.get(url, read='bytes')
+    except Exception as e:
+        print(f"Failed to fetch attachment {attachment_id}: {e}")
+        return False
+    if status != 200:
+        print(f"Failed to fetch attachment {attachment_id}: {status}")
+        return False
+
+    try:
+        with io.BytesIO(content) as file:
+            with pdfplumber.open(file) as pdf:
+                all_text = ""
+                for page in pdf.pages:
+                    all_text += page.extract_text()
     except Exception as e:
+        # Unreadable document, fetching it again won't help
         print(f"Error extracting text from attachment {attachment_id}: {e}")
+        return True
+
+    if not all_text.strip():
+        return True
+
+    # Define the recommendation based on sentiment
+    sentiment = TextBlob(all_text).sentiment.polarity
+    if sentiment > 0:
+        recommendation = actions["positive"]
+    elif sentiment < 0:
+        recommendation = actions["negative"]
+    else:
+        recommendation = actions["neutral"]
+
+    # On the writer thread; the insert also bumps the issuer's RecommendationCounts.
+    # The row keeps the issuer's previous watermark until fetch_documents has saved
+    # every attachment, so an interrupted scrape starts the issuer over
+    await db.write(save_to_database, 'all_info', (issuer, recommendation, last_scraped_date))
+
+    # Add attachment ID to the map for the issuer
+    if issuer not in attachment_ids_map:
+        attachment_ids_map[issuer] = []
+    attachment_ids_map[issuer].append(attachment_id)
+    return True
 
 
-async def fetch_documents(session, issuer_id, attachment_ids_map):
-    search_url = f"https://www.seinet.com.mk/search/{issuer_id}"
+async def fetch_documents(client, db, issuer_id, attachment_ids_map):
+    search_url = f"{SEINET_BASE_URL}/search/{issuer_id}"
     issuer_name=get_issuer_name_from_csv(issuer_id)
-    date_from = get_last_scraped_date(issuer_name)
+    # Runs on the DB reader pool instead of blocking the event loop
+    date_from = await db.read(get_last_scraped_date, issuer_name)
     date_to = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
 
     print(f"Fetching documents for Issuer ID {issuer_id} from {date_from} to {date_to}")
 
     try:
-        async with session.get(search_url) as response:
-            if response.status == 200:
-                # Simulate loading the page and triggering the POST request
-                data = {
-                    "issuerId": issuer_id,
-                    "languageId": 1,
-                    "channelId": 1,
-                    "dateFrom": date_from,
-                    "dateTo": date_to,
-                }
-
-                post_url = "https://api.seinet.com.mk/public/documents"
-
-                # print(f"Starting to fetch documents for Issuer ID {issuer_id}")
-
-                async with session.post(post_url, json=data) as post_response:
-                    if post_response.status == 200:
-                        post_data = await post_response.json()
-                        print(
-                            f"Fetched {len(post_data.get('data', []))} documents for Issuer ID {issuer_id}")  # Logging result count
-                        for document in post_data.get("data", []):
-                            # issuer = document["issuer"].get("localizedTerms", [{}])[0].get("displayName")
-                            issuer = issuers.get(issuer_id)
-                            published_date = document.get("publishedDate")
-
-                            for attachment in document.get("attachments", []):
-                                attachment_id = attachment.get("attachmentId")
-                                file_name = attachment.get("fileName")
-                                await fetch_attachment(session, attachment_id, issuer, date_to, file_name,
-                                                       attachment_ids_map)
-
-                    else:
-                        print(
-                            f"Failed to retrieve documents for Issuer ID {issuer_id}. Status code: {post_response.status}")
+        status, _ = await client.get(search_url)
+        if status == 200:
+            # Simulate loading the page and triggering the POST request
+            data = {
+                "issuerId": issuer_id,
+                "languageId": 1,
+                "channelId": 1,
+                "dateFrom": date_from,
+                "dateTo": date_to,
+            }
+
+            post_url = f"{SEINET_API_URL}/public/documents"
+
+            # print(f"Starting to fetch documents for Issuer ID {issuer_id}")
+
+            post_status, post_data = await client.post(post_url, read='json', json=data)
+            if post_status == 200:
+                print(
+                    f"Fetched {len(post_data.get('data', []))} documents for Issuer ID {issuer_id}")  # Logging result count
+                complete = True
+                for document in post_data.get("data", []):
+                    # issuer = document["issuer"].get("localizedTerms", [{}])[0].get("displayName")
+                    issuer = issuers.get(issuer_id)
+                    published_date = document.get("publishedDate")
+
+                    for attachment in document.get("attachments", []):
+                        attachment_id = attachment.get("attachmentId")
+                        file_name = attachment.get("fileName")
+                        if not await fetch_attachment(client, db, attachment_id, issuer, date_from, file_name,
+                                                      attachment_ids_map):
+                            complete = False
+
+                # Move the issuer's watermark once, when every attachment is saved
+                if complete:
+                    await db.write(update_last_scraped_date, issuer_name, date_to)
+                else:
+                    print(f"Keeping the watermark of Issuer ID {issuer_id} at {date_from}, attachments failed")
+
             else:
-                print(f"Failed to load search page for Issuer ID {issuer_id}. Status code: {response.status}")
+                print(
+                    f"Failed to retrieve documents for Issuer ID {issuer_id}. Status code: {post_status}")
+        else:
+            print(f"Failed to load search page for Issuer ID {issuer_id}. Status code: {status}")
     except Exception as e:
         print(f"Error processing Issuer ID {issuer_id}: {e}")
 
 
-async def fetch_all_issuer_documents(session, issuer_ids):
+async def fetch_all_issuer_documents(client, db, issuer_ids):
     attachment_ids_map = {}  # Dictionary to store attachment IDs by issuer
     for issuer_id in issuer_ids:
         # Fetch and save all documents and attachments for one issuer before moving to the next
-        await fetch_documents(session, issuer_id, attachment_ids_map)
+        await fetch_documents(client, db, issuer_id, attachment_ids_map)
 
     # Print attachment IDs and their count for each issuer
     for issuer, attachment_ids in attachment_ids_map.items():
@@ -352,12 +380,17 @@ def calculate_final_recommendations():
 # Main function remains unchanged
 async def main():
     setup_database()  # Ensure the database is set up
-    async with aiohttp.ClientSession() as session:
+    # Shared HTTP policy: adaptive concurrency, retries and a circuit breaker per host
+    async with HttpClient() as client, AsyncDB() as db:
         # Fetch documents for all issuers sequentially
-        await fetch_all_issuer_documents(session, issuer_ids)
+        await fetch_all_issuer_documents(client, db, issuer_ids)
 
     # Calculate the final recommendations after all issuers are processed
     calculate_final_recommendations()
 
+    # Publish the new sentiment rows to the read snapshot used by the service
+    publish_read_snapshot()
+
 
-asyncio.run(main())
+if __name__ == '__main__':
+    asyncio.run(main())
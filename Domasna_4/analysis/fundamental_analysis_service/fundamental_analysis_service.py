@@ -2,51 +2,58 @@ from flask import Flask, request, jsonify
 import sqlite3
 import os
 
-from Domasna_4.analysis.DB import DatabaseConnection, test_database_connection
+from Domasna_4.analysis.DB import DatabaseConnection, test_database_connection, RECOMMENDATION_COUNTS_QUERY, \
+    ALL_RECOMMENDATION_COUNTS_QUERY
 
 app = Flask(__name__)
 
-def get_recommendation_counts(issuer):
-    """Fetch recommendation counts from the database."""
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the request's database connection to the pool."""
+    DatabaseConnection().release_connection()
+
+def summarize_counts(buy, sell, hold):
+    """Turns an issuer's buy/sell/hold counts into the service's response."""
+    counts = {"Buy": buy, "Sell": sell, "Hold": hold}
+    if counts["Buy"] > counts["Sell"]:
+        recommendation = "Buy"
+    elif counts["Sell"] > counts["Buy"]:
+        recommendation = "Sell"
+    else:
+        recommendation = "Hold"
+
+    return {**counts, "Recommendation": recommendation}
+
+
+def query_counts(query, params=()):
     try:
-        #Use Singleton to get the shared database connection  #Use Singleton to get the shared database connection
-        db = DatabaseConnection().get_connection()
+        # Read from the published snapshot so ingest writes never block this query
+        db = DatabaseConnection().get_read_connection()
         cursor = db.cursor()
-        cursor.execute("""
-            SELECT 'buy' AS recommendation, COUNT(*) 
-            FROM all_info 
-            WHERE issuer = ? AND recommendation = 'buy'
-            UNION
-            SELECT 'sell' AS recommendation, COUNT(*) 
-            FROM all_info 
-            WHERE issuer = ? AND recommendation = 'sell'
-            UNION
-            SELECT 'hold' AS recommendation, COUNT(*) 
-            FROM all_info 
-            WHERE issuer = ? AND recommendation = 'hold'
-        """, (issuer, issuer, issuer))
-        results = cursor.fetchall()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'RecommendationCounts'")
+        if cursor.fetchone() is None:
+            results = []  # Snapshot published before any counts were stored
+        else:
+            cursor.execute(query, params)
+            results = cursor.fetchall()
         cursor.close()
     except sqlite3.Error as db_error:
         raise Exception(f"Database query error: {db_error}")
     except Exception as e:
         raise Exception(f"Unexpected error: {e}")
+    return results
 
-    # Process the results into a dictionary
-    counts = {"Buy": 0, "Sell": 0, "Hold": 0}
-    for recommendation, count in results:
-        recommendation = recommendation.capitalize()
-        if recommendation in counts:
-            counts[recommendation] = count
 
-    if counts["Buy"] > counts["Sell"]:
-        recommendation = "Buy"
-    elif counts["Sell"] > counts["Buy"]:
-        recommendation = "Sell"
-    else:
-        recommendation = "Hold"
+def get_recommendation_counts(issuer):
+    """Fetch an issuer's recommendation counts (a primary-key lookup in RecommendationCounts)."""
+    results = query_counts(RECOMMENDATION_COUNTS_QUERY, (issuer,))
+    return summarize_counts(*(results[0] if results else (0, 0, 0)))
 
-    return {**counts, "Recommendation": recommendation}
+
+def get_all_recommendation_counts():
+    """Fetch the recommendation counts of every issuer, keyed by issuer."""
+    return {issuer: summarize_counts(buy, sell, hold)
+            for issuer, buy, sell, hold in query_counts(ALL_RECOMMENDATION_COUNTS_QUERY)}
 
 
 @app.route('/api/fundamental-analysis', methods=['POST'])
@@ -64,6 +71,14 @@ def analyze_fundamentals():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/fundamental-analysis/all', methods=['GET'])
+def analyze_all_fundamentals():
+    try:
+        return jsonify(get_all_recommendation_counts())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 if __name__ == '__main__':
     try:
         test_database_connection()  # Test the connection at startup
@@ -0,0 +1,319 @@
+"""
+Shared HTTP policy for the mse.mk and seinet scrapers (filters/F1, filters/F3 and
+fundamental_analysis).
+
+Every request goes through the same rules, kept per host:
+
+- AIMD concurrency: the number of requests in flight grows by about one per round of
+  successful requests and is halved when the host throttles (429/503) or times out.
+- Retries with full-jitter exponential backoff on timeouts, connection errors and
+  429/5xx responses, honouring Retry-After.
+- A circuit breaker: after a run of failures the host is left alone for a while, then a
+  single trial request decides whether it is back.
+
+    async with HttpClient() as client:
+        status, page = await client.get(url, params=params)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+
+# Sites the scrapers talk to; overridden to point them at a local stand-in (benchmarks/standin_server)
+MSE_BASE_URL = os.environ.get('MSE_BASE_URL', 'https://www.mse.mk')
+SEINET_BASE_URL = os.environ.get('SEINET_BASE_URL', 'https://www.seinet.com.mk')
+SEINET_API_URL = os.environ.get('SEINET_API_URL', 'https://api.seinet.com.mk')
+
+# Seconds a whole request (connect, send, read) may take
+DEFAULT_TIMEOUT = 30
+# Attempts after the first one
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+# Responses worth retrying; the rest are returned to the caller as they are
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses telling us to slow down, which shrink the concurrency window
+THROTTLE_STATUSES = {429, 503}
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30.0
+# How often requests held back by a half-open breaker check whether its trial succeeded
+BREAKER_TRIAL_POLL = 0.1
+
+# Request latencies kept for benchmarks; older ones are dropped so long ingests stay bounded
+LATENCY_SAMPLES = 10000
+
+
+class FetchError(Exception):
+    """A request that still failed after all retries."""
+
+
+class CircuitOpenError(FetchError):
+    """The host's circuit breaker is open, so the request wasn't sent."""
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter backoff for the given retry, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, min(BACKOFF_CAP, float(retry_after)))
+        except ValueError:
+            pass  # An HTTP date; the jittered delay will do
+    return delay
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on requests in flight to one host.
+
+        async with limiter:
+            ...  # waits while `limit` requests are already running
+        limiter.on_success() / limiter.on_congestion(started)
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=20, decrease=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.in_flight = 0
+        self._condition = None
+        self._last_decrease = 0.0
+
+    async def __aenter__(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        # +1/limit per response is +1 per round of `limit` responses
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_congestion(self, started):
+        # Requests sent before the last decrease saw the old limit; one round halves it once
+        if started >= self._last_decrease:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._last_decrease = time.monotonic()
+
+
+class CircuitBreaker:
+    """Closed while the host answers; open after `failure_threshold` failures in a row."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def trial_pending(self):
+        return self._trial
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'open' if time.monotonic() - self.opened_at < self.reset_timeout else 'half-open'
+
+    def check(self, host):
+        """
+        Raises CircuitOpenError unless a request may go out now.
+
+        Returns True when the request is the half-open trial; the caller must then call
+        end_trial() once it is over, however it ended.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(f"Circuit for {host} is open, retry in {max(remaining, 0):.0f}s")
+            self._trial = True  # Half-open: let a single request find out if the host is back
+            return True
+
+    def end_trial(self):
+        """Frees the trial slot of a trial that recorded no outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self, host):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                print(f"Opening circuit for {host} after {self.failures} failures.")
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+
+class HttpClient:
+    """
+    aiohttp session with the adaptive limit, retries and circuit breaker applied per host.
+
+    request() returns (status, body). The body is read as text, json or bytes for 200
+    responses and is None otherwise; statuses that aren't retried (404, ...) are returned
+    as they are. FetchError is raised once the retries are used up, CircuitOpenError
+    straight away while the host's breaker is open.
+    """
+
+    def __init__(self, max_concurrent=20, per_host=8, initial_concurrency=4, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.per_host = per_host
+        self.initial_concurrency = initial_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = None
+        self._hosts = {}
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # Seconds per recent request sent, for benchmarks
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrent, limit_per_host=self.per_host)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = (
+                AdaptiveLimiter(self.initial_concurrency, maximum=self.per_host),
+                CircuitBreaker(self.failure_threshold, self.reset_timeout),
+            )
+        return self._hosts[host]
+
+    async def request(self, method, url, read='text', **kwargs):
+        host = urlsplit(url).netloc
+        limiter, breaker = self._host(host)
+        for attempt in range(self.retries + 1):
+            while True:
+                try:
+                    trial = breaker.check(host)
+                    break
+                except CircuitOpenError:
+                    if not breaker.trial_pending:
+                        self.counters["rejected"] += 1
+                        raise
+                    await asyncio.sleep(BREAKER_TRIAL_POLL)  # The trial request decides for us
+            retry_after = status = None
+            self.counters["requests"] += 1
+            started = time.monotonic()
+            try:
+                try:
+                    async with limiter:
+                        started = time.monotonic()  # Sent now, under the current limit
+                        async with self.session.request(method, url, **kwargs) as response:
+                            status = response.status
+                            retry_after = response.headers.get('Retry-After')
+                            body = None
+                            if status == 200:
+                                body = await (response.json() if read == 'json' else
+                                              response.read() if read == 'bytes' else response.text())
+                    self.latencies.append(time.monotonic() - started)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = f"{type(e).__name__}: {e}"
+                    if isinstance(e, asyncio.TimeoutError):
+                        limiter.on_congestion(started)
+                else:
+                    if status not in RETRY_STATUSES:
+                        limiter.on_success()
+                        breaker.record_success()
+                        return status, body
+                    error = f"HTTP {status}"
+                    if status in THROTTLE_STATUSES:
+                        limiter.on_congestion(started)
+
+                if status != 429:
+                    breaker.record_failure(host)
+                elif trial:
+                    breaker.record_success()  # A throttling host is up, the limiter deals with it
+            finally:
+                if trial:
+                    breaker.end_trial()  # Cancelled or failed some other way: let another request try
+            if attempt == self.retries:
+                break
+            self.counters["retries"] += 1
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+        self.counters["failures"] += 1
+        raise FetchError(f"{method} {url} failed after {self.retries + 1} attempts ({error})")
+
+    async def get(self, url, read='text', **kwargs):
+        return await self.request('GET', url, read=read, **kwargs)
+
+    async def post(self, url, read='text', **kwargs):
+        return await self.request('POST', url, read=read, **kwargs)
+
+    def stats(self):
+        """Current limit, in-flight requests and breaker state per host, with the counters."""
+        return {
+            **self.counters,
+            "hosts": {host: {"limit": round(limiter.limit, 2), "in_flight": limiter.in_flight,
+                             "breaker": breaker.state}
+                      for host, (limiter, breaker) in self._hosts.items()},
+        }
+
+
+# Breakers of the blocking helper, shared by every thread of the process
+_sync_breakers = {}
+_sync_breakers_lock = threading.Lock()
+
+
+def get_sync(url, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, **kwargs):
+    """Blocking GET (requests) with the same retries and circuit breaker as HttpClient."""
+    host = urlsplit(url).netloc
+    with _sync_breakers_lock:
+        breaker = _sync_breakers.setdefault(host, CircuitBreaker())
+    for attempt in range(retries + 1):
+        trial = breaker.check(host)
+        retry_after = status = None
+        try:
+            try:
+                response = requests.get(url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                status = response.status_code
+                if status not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                error = f"HTTP {status}"
+                retry_after = response.headers.get('Retry-After')
+            if status != 429:
+                breaker.record_failure(host)
+            elif trial:
+                breaker.record_success()
+        finally:
+            if trial:
+                breaker.end_trial()
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, retry_after))
+    raise FetchError(f"GET {url} failed after {retries + 1} attempts ({error})")
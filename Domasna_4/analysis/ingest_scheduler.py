@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import threading
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+INGEST_STATE_PATH = os.path.join(DATA_DIR, 'ingest_state.json')
+INGEST_LOCK_PATH = os.path.join(DATA_DIR, 'ingest.lock')
+
+logger = logging.getLogger(__name__)
+
+
+class IngestScheduler:
+    """
+    Runs an ingest job on a background thread whenever the data is older than `ttl` seconds.
+
+    Only one run happens at a time: a thread lock covers this process and a lock file
+    covers the others (the Flask reloader's pair, several server workers); its mtime is
+    refreshed every lock_heartbeat seconds while the job runs, so only a lock left by a
+    crashed process goes stale_lock_after seconds without an update. The time of
+    the last successful run is kept in a state file, so every process, and the next
+    start, agrees on how fresh the data is. After a failed run the next attempt waits
+    check_interval * 2^failures seconds (at most `ttl`), so a site that is down isn't
+    scraped again every check.
+
+        scheduler = IngestScheduler(rescrape_and_update_data, ttl=3600)
+        scheduler.start()
+        scheduler.status()
+    """
+
+    def __init__(self, job, ttl=3600, check_interval=60, stale_lock_after=15 * 60, lock_heartbeat=60,
+                 state_path=INGEST_STATE_PATH, lock_path=INGEST_LOCK_PATH):
+        self.job = job
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.stale_lock_after = stale_lock_after  # A lock not touched for this long belongs to a crashed run
+        self.lock_heartbeat = lock_heartbeat
+        self.state_path = state_path
+        self.lock_path = lock_path
+        self._run_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._running_since = None
+
+    def start(self):
+        """Starts the background thread; calling it again is a no-op."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='ingest-scheduler', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                if self.is_due():
+                    self.run_once()
+            except Exception:
+                # An unwritable state or lock file mustn't stop the scheduler for good
+                logger.exception("Ingest scheduler check failed")
+            time.sleep(self.check_interval)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.state_path)
+
+    def is_stale(self):
+        last_success = self._load_state().get('last_success')
+        return last_success is None or time.time() - last_success >= self.ttl
+
+    def _retry_backoff(self, state):
+        """Seconds to wait after a failed run: doubles with each failure in a row, up to the ttl."""
+        failures = state.get('consecutive_failures', 0)
+        return min(self.ttl, self.check_interval * 2 ** failures) if failures else 0
+
+    def _next_run_due(self, state):
+        """When the next scheduled run may start (None: right away)."""
+        last_success = state.get('last_success')
+        due = last_success + self.ttl if last_success is not None else None
+        if state.get('consecutive_failures') and state.get('last_attempt') is not None:
+            # Don't hammer mse.mk every check_interval while it is down
+            retry_at = state['last_attempt'] + self._retry_backoff(state)
+            due = retry_at if due is None else max(due, retry_at)
+        return due
+
+    def is_due(self):
+        """True when the data is stale and no failure backoff is in effect."""
+        due = self._next_run_due(self._load_state())
+        return due is None or time.time() >= due
+
+    def _acquire_lock_file(self):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) < self.stale_lock_after:
+                        return False
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass  # Released meanwhile, try again
+                continue
+            with os.fdopen(fd, 'w') as file:
+                file.write(str(os.getpid()))
+            return True
+        return False
+
+    def _heartbeat(self, stop):
+        """Touches the lock file until stop is set, so a long run's lock never looks stale."""
+        while not stop.wait(self.lock_heartbeat):
+            try:
+                os.utime(self.lock_path)
+            except OSError:
+                logger.warning("Could not refresh the ingest lock %s", self.lock_path)
+
+    def run_once(self):
+        """Runs the job now unless another run is in progress; returns False if it was skipped."""
+        if not self._run_lock.acquire(blocking=False):
+            return False
+        try:
+            if not self._acquire_lock_file():
+                return False
+            stop_heartbeat = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(stop_heartbeat,), name='ingest-lock-heartbeat',
+                                         daemon=True)
+            heartbeat.start()
+            try:
+                self._running_since = time.time()
+                state = self._load_state()
+                state.update(last_started=self._running_since, last_attempt=self._running_since)
+                self._save_state(state)
+                try:
+                    result = self.job()
+                except Exception as e:
+                    state.update(last_finished=time.time(), last_error=f"{type(e).__name__}: {e}",
+                                 consecutive_failures=state.get('consecutive_failures', 0) + 1)
+                    print(f"Scheduled ingest failed: {e}")
+                else:
+                    state.update(last_finished=time.time(), last_success=time.time(), last_error=None,
+                                 last_result=result, consecutive_failures=0)
+                self._save_state(state)
+            finally:
+                self._running_since = None
+                stop_heartbeat.set()
+                heartbeat.join()
+                try:
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+            return True
+        finally:
+            self._run_lock.release()
+
+    def status(self):
+        """Describes the last run and when the next one is due, for the status endpoint."""
+        state = self._load_state()
+        return {
+            "running": self._running_since is not None or os.path.exists(self.lock_path),
+            "running_since": self._running_since,
+            "last_started": state.get('last_started'),
+            "last_finished": state.get('last_finished'),
+            "last_attempt": state.get('last_attempt'),
+            "last_success": state.get('last_success'),
+            "last_error": state.get('last_error'),
+            "consecutive_failures": state.get('consecutive_failures', 0),
+            "retry_backoff": self._retry_backoff(state),
+            "last_result": state.get('last_result'),
+            "stale": self.is_stale(),
+            "next_run_due": self._next_run_due(state),
+            "ttl": self.ttl,
+            "scheduler_started": self._thread is not None and self._thread.is_alive(),
+        }
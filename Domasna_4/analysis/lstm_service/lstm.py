@@ -10,33 +10,29 @@ import sqlite3
 import os
 import matplotlib.pyplot as plt
 
-from Domasna_4.analysis.DB import DatabaseConnection
+from Domasna_4.analysis.DB import fetch_symbol_history, SYMBOL_HISTORY_COLUMNS
+from Domasna_4.analysis.snapshots import load_symbol_snapshot
 
 
-def preprocess_data(symbol):
-    #Use Singleton to get the shared database connection
-    db = DatabaseConnection().get_connection()
-    query = f"SELECT Date, Max, Min, Volume FROM StockData WHERE Symbol='{symbol}'"
-    data = pd.read_sql(query, db)
-    if data.empty:
-        return None, None
+def load_features(symbol):
+    """Returns the Max, Min and Volume history of a symbol in date order."""
+    snapshot = load_symbol_snapshot(symbol)
+    if snapshot is not None:
+        return pd.DataFrame({col: snapshot[col] for col in ['Max', 'Min', 'Volume']})
 
-    # Convert Date column to datetime
-    data['Date'] = pd.to_datetime(data['Date'], errors='coerce')
+    # Read from the published snapshot so ingest writes never block this query
+    rows = fetch_symbol_history(symbol, read_only=True)
+    history = pd.DataFrame(rows, columns=SYMBOL_HISTORY_COLUMNS)
+    return history[['Max', 'Min', 'Volume']]
 
-    # Clean numeric columns
-    for col in ['Max', 'Min']:
-        data[col] = data[col].astype(str).str.replace('.', '', regex=False)
-        data[col] = data[col].str.replace(',', '.', regex=False)
-        data[col] = pd.to_numeric(data[col], errors='coerce')
 
-    data['Volume'] = data['Volume'].astype(str).str.replace(' ', '', regex=False)
-    data['Volume'] = data['Volume'].str.replace(',', '.', regex=False)
-    data['Volume'] = pd.to_numeric(data['Volume'], errors='coerce')
+def preprocess_data(symbol):
+    data = load_features(symbol)
+    if data.empty:
+        return None, None
 
+    # Columns are stored as REAL/INTEGER, so no string cleaning is needed
     data.dropna(subset=['Max', 'Min', 'Volume'], inplace=True)
-    data = data.sort_values('Date')
-    data = data[['Max', 'Min', 'Volume']]
 
     if len(data) < 2:
         return None, None  # Insufficient data
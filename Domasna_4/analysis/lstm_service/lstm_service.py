@@ -1,10 +1,15 @@
 from flask import Flask, jsonify, request
 
-from Domasna_4.analysis.DB import test_database_connection
+from Domasna_4.analysis.DB import DatabaseConnection, test_database_connection
 from lstm import train_and_predict
 
 app = Flask(__name__)
 
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the request's database connection to the pool."""
+    DatabaseConnection().release_connection()
+
 @app.route('/api/lstm', methods=['POST'])
 def predict():
     data = request.json
@@ -0,0 +1,245 @@
+"""
+On-disk archive of the raw mse.mk history pages fetched by filters/F3.
+
+Every response is stored gzip-compressed under its SHA-256, so identical pages are kept
+once, and an index maps each (issuer, FromDate, ToDate) request to its page. A window
+that ended before the day it was fetched can't change any more: it is marked immutable
+and F3 serves it from here instead of requesting it again. The archive holds its own
+index, so StockData can be rebuilt from it without the network (or the old database):
+
+    python -m Domasna_4.analysis.page_archive replay --reset
+    python -m Domasna_4.analysis.page_archive stats
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+PAGE_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'page_archive')
+
+PAGES_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS Pages (
+    Issuer TEXT NOT NULL,
+    FromDate TEXT NOT NULL,
+    ToDate TEXT NOT NULL,
+    Hash TEXT NOT NULL,
+    FetchedAt TEXT NOT NULL,
+    Immutable INTEGER NOT NULL,
+    PRIMARY KEY (Issuer, FromDate, ToDate)
+) WITHOUT ROWID
+'''
+
+ARCHIVED_PAGE_QUERY = '''
+SELECT Hash FROM Pages
+WHERE Issuer = ? AND FromDate = ? AND ToDate = ? AND Immutable = 1
+'''
+
+PUT_PAGE_QUERY = '''
+INSERT OR REPLACE INTO Pages (Issuer, FromDate, ToDate, Hash, FetchedAt, Immutable)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+ARCHIVE_ENTRIES_QUERY = "SELECT Issuer, FromDate, ToDate, Hash FROM Pages ORDER BY Issuer"
+
+ARCHIVE_STATS_QUERY = "SELECT COUNT(*), SUM(Immutable), COUNT(DISTINCT Hash) FROM Pages"
+
+
+class PageArchive:
+    """
+    Content-addressed store of history pages with an (issuer, FromDate, ToDate) index.
+
+    Dates are kept exactly as they were requested (MM/DD/YYYY). Methods open their own
+    short-lived index connection, so one archive can be shared by executor threads.
+
+        archive = PageArchive()
+        archive.put('ALK', '01/01/2020', '12/30/2020', page)
+        archive.get('ALK', '01/01/2020', '12/30/2020')  # the page, without a request
+    """
+
+    def __init__(self, directory=PAGE_ARCHIVE_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.db')
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, timeout=30)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(PAGES_TABLE_SQL)
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], f"{digest}.html.gz")
+
+    def read_blob(self, digest):
+        with gzip.open(self.blob_path(digest), 'rt', encoding='utf-8') as file:
+            return file.read()
+
+    def get(self, issuer, from_date, to_date):
+        """Returns the archived page of an immutable window, or None if it has to be fetched."""
+        if not os.path.exists(self.index_path):
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute(ARCHIVED_PAGE_QUERY, (issuer, from_date, to_date)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        try:
+            return self.read_blob(row[0])
+        except OSError:
+            return None  # Blob lost, fetch the window again
+
+    def put(self, issuer, from_date, to_date, page, fetched_on=None):
+        """
+        Stores a fetched page and returns its hash.
+
+        The window is immutable if it ended before fetched_on (today by default); pages
+        of windows that still include the fetch day replace each other until then.
+        """
+        fetched_on = fetched_on or datetime.now()
+        data = page.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as file:
+                # mtime=0 so equal pages compress to equal bytes
+                file.write(gzip.compress(data, compresslevel=9, mtime=0))
+            os.replace(tmp_path, path)
+
+        immutable = datetime.strptime(to_date, '%m/%d/%Y').date() < fetched_on.date()
+        connection = self._connect()
+        try:
+            connection.execute(PUT_PAGE_QUERY, (issuer, from_date, to_date, digest,
+                                                fetched_on.isoformat(timespec='seconds'), int(immutable)))
+            connection.commit()
+        finally:
+            connection.close()
+        return digest
+
+    def entries(self):
+        """Every archived window as (issuer, from_date, to_date, hash)."""
+        if not os.path.exists(self.index_path):
+            return []
+        connection = self._connect()
+        try:
+            return connection.execute(ARCHIVE_ENTRIES_QUERY).fetchall()
+        finally:
+            connection.close()
+
+    def stats(self):
+        pages = immutable = blobs = 0
+        if os.path.exists(self.index_path):
+            connection = self._connect()
+            try:
+                pages, immutable, blobs = connection.execute(ARCHIVE_STATS_QUERY).fetchone()
+            finally:
+                connection.close()
+        size = 0
+        for root, _, files in os.walk(os.path.join(self.directory, 'blobs')):
+            size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return {"pages": pages, "immutable": immutable or 0, "blobs": blobs, "bytes": size}
+
+
+def _parse_archived_page(job):
+    """Process pool worker: parses one archived page into normalized StockData rows."""
+    from Domasna_4.analysis.filters.F3 import parse_window
+
+    directory, digest = job
+    return parse_window(PageArchive(directory).read_blob(digest))
+
+
+def first_missing_day(windows, calendar=None):
+    """
+    Start (MM/DD/YYYY) of the first gap between an issuer's archived (from_date, to_date)
+    windows that holds a trading session, or None if they cover their range.
+
+    A gap without sessions is a refresh skipping weekends and holidays; one with sessions
+    is a window that failed and was never archived. The calendar (by default one from the
+    holiday rules alone, since StockData may be what is being rebuilt) decides which it is.
+    """
+    from Domasna_4.analysis.fetch_planner import TradingCalendar
+
+    calendar = calendar or TradingCalendar()
+    parse = lambda value: datetime.strptime(value, '%m/%d/%Y').date()
+    spans = sorted((parse(from_date), parse(to_date)) for from_date, to_date in windows)
+    covered = spans[0][1]
+    for from_date, to_date in spans[1:]:
+        gap_start = covered + timedelta(days=1)
+        if from_date > gap_start and calendar.sessions(gap_start, from_date - timedelta(days=1)):
+            return gap_start.strftime('%m/%d/%Y')
+        covered = max(covered, to_date)
+    return None
+
+
+def replay(archive=None, reset=False, workers=None):
+    """
+    Rebuilds StockData from the archived pages, without any network access.
+
+    Pages are parsed on a pool of worker processes with the current F3 parser and
+    normalization, and each issuer's rows are written with bulk_ingest, which also keeps
+    the derived tables up to date. With reset=True the stock tables are emptied first, so
+    rows already stored are replaced rather than kept. An issuer's watermark is moved to
+    the end of its last archived window unless it is already later; if a window is missing
+    (see first_missing_day) it is set to the start of the gap instead, so the next refresh
+    fetches it. Returns the replayed issuers and the inserted/skipped row totals.
+    """
+    from Domasna_4.analysis.DB import bulk_ingest, get_last_saved_date, reset_stock_data
+
+    archive = archive or PageArchive()
+    windows = {}
+    for issuer, from_date, to_date, digest in archive.entries():
+        windows.setdefault(issuer, []).append((from_date, to_date, digest))
+    if reset:
+        reset_stock_data()
+
+    totals = {"inserted": 0, "skipped": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for issuer, issuer_windows in windows.items():
+            pages = pool.map(_parse_archived_page, [(archive.directory, digest) for _, _, digest in issuer_windows])
+            rows = [row for page in pages for row in page]
+
+            last_date = first_missing_day([(from_date, to_date) for from_date, to_date, _ in issuer_windows])
+            if last_date is None:
+                last_date = max((to_date for _, to_date, _ in issuer_windows),
+                                key=lambda day: datetime.strptime(day, '%m/%d/%Y'))
+                saved = get_last_saved_date(issuer)
+                if saved and datetime.strptime(saved, '%m/%d/%Y') > datetime.strptime(last_date, '%m/%d/%Y'):
+                    last_date = saved
+            result = bulk_ingest([(issuer, rows, last_date)])
+            totals["inserted"] += result["inserted"]
+            totals["skipped"] += result["skipped"]
+            print(f"Replayed {len(issuer_windows)} pages for issuer: {issuer}")
+    return list(windows), totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['replay', 'stats'])
+    parser.add_argument('--reset', action='store_true', help='empty the stock tables before replaying')
+    parser.add_argument('--workers', type=int, help='parser processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(PageArchive().stats())
+        return
+
+    from Domasna_4.analysis.DB import init_createDB
+
+    init_createDB()
+    issuers, totals = replay(reset=args.reset, workers=args.workers)
+    print(f"Replayed {len(issuers)} issuers: {totals['inserted']} rows inserted, {totals['skipped']} skipped.")
+
+
+if __name__ == '__main__':
+    main()
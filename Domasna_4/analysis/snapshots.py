@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+
+from Domasna_4.analysis.DB import fetch_symbol_history, get_symbol_watermark, SYMBOL_HISTORY_COLUMNS
+
+# One .npy file per column, so readers can memory-map exactly the columns they need
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'snapshots')
+SNAPSHOT_COLUMNS = SYMBOL_HISTORY_COLUMNS
+
+
+def _snapshot_path(symbol, name):
+    return os.path.join(SNAPSHOT_DIR, symbol, name)
+
+
+def _write_atomically(path, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        write(file)
+    os.replace(tmp_path, path)
+
+
+def export_symbol_snapshot(symbol):
+    """Writes the symbol's OHLCV history and derived returns to per-column .npy files."""
+    rows = fetch_symbol_history(symbol)
+    if not rows:
+        return 0
+
+    dates, *values = zip(*rows)
+    columns = {'Date': np.array(dates, dtype='datetime64[D]')}
+    for name, column in zip(SNAPSHOT_COLUMNS[1:], values):
+        # NULLs become NaN, so every price/volume/return column is float64
+        columns[name] = np.array(column, dtype=np.float64)
+
+    os.makedirs(os.path.join(SNAPSHOT_DIR, symbol), exist_ok=True)
+    for name, values in columns.items():
+        _write_atomically(_snapshot_path(symbol, f"{name}.npy"), lambda file: np.save(file, values))
+
+    # The metadata goes last: readers only trust columns that match it
+    meta = {"rows": len(rows), "last_date": rows[-1][0]}
+    _write_atomically(_snapshot_path(symbol, 'meta.json'), lambda file: file.write(json.dumps(meta).encode()))
+    return len(rows)
+
+
+def export_snapshots(symbols):
+    """Exports snapshots for several symbols, e.g. after an ingest cycle."""
+    for symbol in symbols:
+        export_symbol_snapshot(symbol)
+
+
+def load_symbol_snapshot(symbol):
+    """
+    Memory-maps a symbol's snapshot columns without copying them.
+
+    Returns a dict of read-only arrays keyed by column name, or None when there is no
+    snapshot or it no longer matches what StockData holds for the symbol.
+    """
+    try:
+        with open(_snapshot_path(symbol, 'meta.json'), 'r') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if (meta.get("rows"), meta.get("last_date")) != get_symbol_watermark(symbol):
+        return None
+
+    columns = {}
+    for name in SNAPSHOT_COLUMNS:
+        try:
+            values = np.load(_snapshot_path(symbol, f"{name}.npy"), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if len(values) != meta["rows"]:
+            return None  # Caught mid-export
+        columns[name] = values
+    return columns
@@ -2,8 +2,9 @@ import pandas as pd
 from .base import TechnicalIndicator
 
 class RSIIndicator(TechnicalIndicator):
-    def calculate(self, data, window=14):
-        delta = data.diff()
+    def calculate(self, data, window=14, change=None):
+        # change: precomputed day-over-day price change, saves diffing the prices again
+        delta = change if change is not None else data.diff()
         gain = delta.where(delta > 0, 0).rolling(window=window).mean()
         loss = -delta.where(delta < 0, 0).rolling(window=window).mean()
         rs = gain / loss
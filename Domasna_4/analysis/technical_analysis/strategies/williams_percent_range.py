@@ -2,14 +2,16 @@ from .base import TechnicalIndicator
 
 
 class WilliamsPercentRangeIndicator(TechnicalIndicator):
-    def calculate(self, data, high, low, window):
+    def calculate(self, data, high, low, window, highest_high=None, lowest_low=None):
         # print(f"Received data: {data}")
         # print(f"Received high: {high}")
         # print(f"Received low: {low}")
         # print(f"Received window: {window}")
 
-        highest_high = high.rolling(window=window).max()
-        lowest_low = low.rolling(window=window).min()
+        # highest_high/lowest_low: precomputed window extremes (DB.rolling_high_low)
+        if highest_high is None or lowest_low is None:
+            highest_high = high.rolling(window=window).max()
+            lowest_low = low.rolling(window=window).min()
         result = (-100 * (highest_high - data) / (highest_high - lowest_low)).fillna(0)
         # print(f"Calculated Williams %R: {result}")
         return result
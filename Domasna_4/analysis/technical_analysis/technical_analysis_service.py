@@ -7,7 +7,9 @@ import mplfinance as mpf
 
 from flask import Flask, jsonify, request
 
-from Domasna_4.analysis.DB import DatabaseConnection, test_database_connection
+from Domasna_4.analysis.DB import DatabaseConnection, test_database_connection, fetch_symbol_history, \
+    SYMBOL_HISTORY_COLUMNS, rolling_high_low
+from Domasna_4.analysis.snapshots import load_symbol_snapshot
 from Domasna_4.analysis.technical_analysis.strategies.rsi import RSIIndicator
 from Domasna_4.analysis.technical_analysis.strategies.momentum import MomentumIndicator
 from Domasna_4.analysis.technical_analysis.strategies.sma import SMAIndicator
@@ -20,6 +22,14 @@ from Domasna_4.analysis.technical_analysis.visualisation import generate_candles
 
 app = Flask(__name__)
 
+# Lookback of the Williams %R and stochastic oscillator windows
+HIGH_LOW_WINDOW = 14
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the request's database connection to the pool."""
+    DatabaseConnection().release_connection()
+
 @app.route('/api/technical_analysis', methods=['POST'])
 def technical_analysis():
     data = request.json
@@ -36,16 +46,15 @@ def technical_analysis():
 
 
 def get_historical_data(stock_symbol):
-    #Use Singleton to get the shared database connection
-    db = DatabaseConnection().get_connection()
-    query = """
-            SELECT Date, LastTradePrice, Max, Min, Volume
-            FROM StockData
-            WHERE Symbol = ?
-            ORDER BY Date ASC
-        """
-    historical_data = pd.read_sql_query(query, db, params=(stock_symbol,))
-    return historical_data
+    # Prefer the memory-mapped snapshot; fall back to SQLite when it is missing or stale
+    snapshot = load_symbol_snapshot(stock_symbol)
+    if snapshot is not None:
+        return pd.DataFrame(snapshot)
+
+    # Read from the published snapshot so ingest writes never block this query; archived
+    # years are stitched back in by fetch_symbol_history
+    rows = fetch_symbol_history(stock_symbol, read_only=True)
+    return pd.DataFrame(rows, columns=SYMBOL_HISTORY_COLUMNS)
 
 def initialize_strategy_context():
     # Initialize the strategy context
@@ -59,6 +68,18 @@ def initialize_strategy_context():
     context.add_strategy('StochasticOscillator', StochasticOscillatorIndicator())
     return context
 
+def fill_missing_high_low(historical_data):
+    """
+    Gives days without a Max/Min their close (the last traded price, carried forward over
+    days without a trade), the substitution DB._update_returns makes for the range index,
+    so the rolling fallback and rolling_high_low agree.
+    """
+    price = historical_data['LastTradePrice']
+    close = price.where(price != 0).ffill()
+    for column in ('Max', 'Min'):
+        historical_data[column] = historical_data[column].where(historical_data[column] != 0).fillna(close)
+    return historical_data
+
 def process_historical_data(historical_data, stock_symbol):
     """
     Processes historical stock data to generate candlestick data, chart path, and final signals.
@@ -79,12 +100,18 @@ def process_historical_data(historical_data, stock_symbol):
         }
 
     # Preprocess data
-    historical_data['Date'] = pd.to_datetime(historical_data['Date'], format='%m/%d/%Y')
+    # Columns are already typed in the database and the query returns them in date order
+    historical_data['Date'] = pd.to_datetime(historical_data['Date'], format='%Y-%m-%d')
     numerical_cols = ['LastTradePrice', 'Max', 'Min', 'Volume']
-    for col in numerical_cols:
-        historical_data[col] = historical_data[col].apply(clean_numeric_column)
+    fill_missing_high_low(historical_data)
+    historical_data[numerical_cols] = historical_data[numerical_cols].fillna(0)
 
-    historical_data = historical_data.sort_values(by='Date').reset_index(drop=True)
+    # Window highs/lows come from the range index instead of rolling rescans; it has one
+    # position per trading day, so it lines up with the history rows
+    extremes = rolling_high_low(stock_symbol, HIGH_LOW_WINDOW, read_only=True)
+    if extremes is not None and len(extremes[0]) == len(historical_data):
+        historical_data['Highest_High'] = pd.Series(extremes[0], dtype=np.float64)
+        historical_data['Lowest_Low'] = pd.Series(extremes[1], dtype=np.float64)
 
     # Apply strategies for indicators
     context = initialize_strategy_context()
@@ -170,18 +197,6 @@ def resample_data(historical_data):
     return df_monthly, df_weekly, historical_data
 
 
-def clean_numeric_column(value):
-    """Converts numeric strings with thousands separators ('.') and decimal commas (',') to float."""
-    if isinstance(value, str):
-        try:
-            return float(value.replace('.', '').replace(',', '.'))
-        except ValueError:
-            return 0
-    elif isinstance(value, (int, float)):
-        return value  # Already numeric
-    else:
-        return 0
-
 def generate_signals(df):
     # Check if required columns exist
     required_columns = ['RSI', 'Momentum', 'Williams_%R', 'Stochastic_Oscillator']
@@ -210,21 +225,28 @@ def generate_signals(df):
 
 def analyze_data(df, context):
     # Apply the strategies
-    df['RSI'] = context.execute_strategy('RSI', df['LastTradePrice'])
-    df['Momentum'] = context.execute_strategy('SMA', df['LastTradePrice'].diff(), window=10)  # Assuming momentum uses SMA logic
+    # Day-over-day changes are computed once at ingest (StockReturns.PriceChange), against
+    # the carried-forward close, so days without a trade count as unchanged rather than as
+    # a drop to the zero-filled LastTradePrice and back
+    df['RSI'] = context.execute_strategy('RSI', df['LastTradePrice'], change=df['PriceChange'])
+    df['Momentum'] = context.execute_strategy('SMA', df['PriceChange'], window=10)  # Assuming momentum uses SMA logic
     df['Williams_%R'] = context.execute_strategy(
         'Williams',
         df['LastTradePrice'],
         high=df['Max'],
         low=df['Min'],
-        window=14
+        window=HIGH_LOW_WINDOW,
+        highest_high=df.get('Highest_High'),
+        lowest_low=df.get('Lowest_Low')
     )
     df['Stochastic_Oscillator'] = context.execute_strategy(
         'StochasticOscillator',
         df['LastTradePrice'],
         high=df['Max'],
         low=df['Min'],
-        window=14
+        window=HIGH_LOW_WINDOW,
+        highest_high=df.get('Highest_High'),
+        lowest_low=df.get('Lowest_Low')
     )
     df['BB_MA'], df['BB_Upper'], df['BB_Lower'] = context.execute_strategy(
         'BollingerBands',
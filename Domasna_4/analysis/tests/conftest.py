@@ -0,0 +1,64 @@
+"""
+Regression checks for DB.py against a scratch copy of the shipped database.
+
+Run from the repository root:
+    python -m pytest Domasna_4/analysis/tests
+"""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from Domasna_4.analysis import DB
+
+ANALYSIS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The database as it ships: the legacy text schema, before migrate_stock_data
+SHIPPED_DB = os.path.join(ANALYSIS_DIR, 'data', 'stock_data.db')
+# Symbols with the longest histories, re-ingested by incremental_db
+INCREMENTAL_SYMBOLS = ('ALK', 'KMB', 'MPT')
+
+
+@pytest.fixture
+def stock_db(tmp_path, monkeypatch):
+    """A scratch copy of the shipped database, which DB.py's connection pool is pointed at."""
+    path = tmp_path / 'stock_data.db'
+    shutil.copy(SHIPPED_DB, path)
+    monkeypatch.setenv('STOCK_DATA_DB', str(path))
+    monkeypatch.setattr(DB.DatabaseConnection, '_instance', None)
+    monkeypatch.setattr(DB, 'READ_SNAPSHOT_DIR', str(tmp_path / 'read_snapshots'))
+    monkeypatch.setattr(DB, 'READ_SNAPSHOT_POINTER', str(tmp_path / 'read_snapshots' / 'CURRENT'))
+    monkeypatch.chdir(ANALYSIS_DIR)  # init_createDB reads ../symbols.csv
+    yield str(path)
+    DB.DatabaseConnection().close_connection()
+
+
+@pytest.fixture
+def migrated_db(stock_db):
+    """The scratch database after init_createDB: typed schema, indexes and derived tables."""
+    DB.init_createDB()
+    return stock_db
+
+
+@pytest.fixture
+def incremental_db(migrated_db):
+    """
+    The migrated database with INCREMENTAL_SYMBOLS ingested again the way refreshes write
+    them: the middle of each history first, then a backfill of its start, then appends of
+    50 rows. Tests compare the derived tables this leaves with a full rebuild.
+    """
+    with sqlite3.connect(migrated_db) as connection:
+        rows = {symbol: [list(row) for row in connection.execute('''
+            SELECT Date, LastTradePrice, Max, Min, AvgPrice, PercentageChange, Volume,
+                   TurnoverInBEST, TotalTurnover
+            FROM StockData WHERE Symbol = ? ORDER BY Date
+        ''', (symbol,))] for symbol in INCREMENTAL_SYMBOLS}
+    DB.reset_stock_data()
+
+    for symbol, history in rows.items():
+        third = len(history) // 3
+        DB.bulk_ingest([(symbol, history[third:2 * third], None)])
+        DB.bulk_ingest([(symbol, history[:third], None)])
+        for start in range(2 * third, len(history), 50):
+            DB.bulk_ingest([(symbol, history[start:start + 50], None)])
+    return migrated_db
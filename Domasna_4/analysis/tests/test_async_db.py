@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from Domasna_4.analysis import DB
+from Domasna_4.analysis.async_db import AsyncDB
+
+
+def test_connections_return_to_the_pool(migrated_db, monkeypatch):
+    pool = DB.DatabaseConnection()
+    created = []
+    create_connection = pool._create_connection
+
+    def tracked_connection():
+        connection = create_connection()
+        created.append(connection)
+        return connection
+
+    monkeypatch.setattr(pool, '_create_connection', tracked_connection)
+    while pool._idle:
+        pool._idle.pop().close()  # So every worker has to open its own
+
+    def slow_read(symbol):
+        time.sleep(0.05)  # Keeps every reader busy at once
+        return DB.get_last_saved_date(symbol)
+
+    async def work():
+        async with AsyncDB(readers=4) as db:
+            await asyncio.gather(*(db.read(slow_read, 'ALK') for _ in range(16)))
+            await db.update_last_date('ALK', '01/02/2024')
+            return await db.get_last_saved_date('ALK')
+
+    assert asyncio.run(work()) == '01/02/2024'
+    assert len(created) >= 2
+    assert all(connection in pool._idle for connection in created)
@@ -0,0 +1,54 @@
+import sqlite3
+
+from Domasna_4.analysis import DB
+
+
+def all_rows():
+    return [row for symbol in DB.fetch_symbols.uncached() for row in DB.fetch_symbol_history(symbol)]
+
+
+def test_compaction_round_trip(migrated_db):
+    before = all_rows()
+
+    result = DB.compact_history(keep_years=2)
+
+    assert result["blocks"] > 0
+    assert all_rows() == before
+    # Running it again finds nothing left to move
+    assert DB.compact_history(keep_years=2) == {"blocks": 0, "rows": 0}
+    assert all_rows() == before
+
+
+def test_backfill_into_archived_year_skips_archived_rows(migrated_db):
+    DB.compact_history(keep_years=2)
+    with sqlite3.connect(migrated_db) as connection:
+        symbol, year = connection.execute('SELECT Symbol, Year FROM StockDataArchive LIMIT 1').fetchone()
+        live_rows = connection.execute('SELECT COUNT(*) FROM StockData').fetchone()[0]
+    history = [row for row in DB.fetch_symbol_history(symbol) if row[0].startswith(str(year))]
+    archived = [[day, price, high, low, price, 0.0, volume, None, None]
+                for day, price, high, low, volume in (row[:5] for row in history)]
+
+    result = DB.bulk_ingest([(symbol, archived, None)])
+
+    assert result == {"inserted": 0, "skipped": len(archived)}
+    with sqlite3.connect(migrated_db) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM StockData').fetchone()[0] == live_rows
+
+    # A day the archive doesn't have is still stored
+    missing = f"{year}-12-31"
+    assert missing not in {row[0] for row in history}
+    result = DB.bulk_ingest([(symbol, [[missing, 1.0, 1.0, 1.0, 1.0, 0.0, 1, 1.0, 1.0]], None)])
+    assert result == {"inserted": 1, "skipped": 0}
+
+
+def test_reads_without_an_archive_table(stock_db):
+    # The shipped database, like read snapshots published before compaction existed, has no archive
+    with sqlite3.connect(stock_db) as connection:
+        assert not connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'StockDataArchive'").fetchone()
+        live_rows = connection.execute("SELECT COUNT(*) FROM StockData WHERE Symbol = 'ALK'").fetchone()[0]
+
+    assert 'ALK' in DB.fetch_symbols.uncached()
+    rows, last_date = DB.get_symbol_watermark('ALK')
+    assert rows == live_rows and last_date
+    assert DB.last_trade_dates(['ALK', 'NOPE']) == {'ALK': last_date, 'NOPE': None}
@@ -0,0 +1,78 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from Domasna_4.analysis.benchmarks.standin_server import StandinServer
+from Domasna_4.analysis import http_client
+from Domasna_4.analysis.http_client import FetchError, HttpClient
+
+
+@pytest.fixture
+def standin():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = StandinServer(issuers=1)
+    base_url = server.start_in_thread(port=port)
+    yield server, f"{base_url}/page.aspx/stats/symbolhistory/AAAA"
+    server.stop()
+
+
+def half_open(client, url):
+    """Opens the url's host breaker and lets its reset timeout pass."""
+    _, breaker = client._host(url.split('/')[2])
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    return breaker
+
+
+def test_throttled_trial_closes_the_breaker(standin):
+    server, url = standin
+    server.throttle_rate = 1.0
+
+    async def run():
+        async with HttpClient(retries=0) as client:
+            breaker = half_open(client, url)
+            with pytest.raises(FetchError):
+                await client.get(url)
+            return breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == 'closed'
+    assert not breaker.trial_pending
+
+
+def test_cancelled_trial_frees_the_trial_slot(standin):
+    server, url = standin
+    server.latency_ms = 5000
+
+    async def run():
+        async with HttpClient(retries=0) as client:
+            breaker = half_open(client, url)
+            trial = asyncio.ensure_future(client.get(url))
+            await asyncio.sleep(0.2)
+            assert breaker.trial_pending
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+            return breaker
+
+    breaker = asyncio.run(run())
+    assert breaker.state == 'half-open'
+    assert not breaker.trial_pending
+
+
+def test_latencies_keep_only_recent_requests(standin, monkeypatch):
+    _, url = standin
+    monkeypatch.setattr(http_client, 'LATENCY_SAMPLES', 3)
+
+    async def run():
+        async with HttpClient(retries=0) as client:
+            for _ in range(5):
+                await client.get(url)
+            return client
+
+    client = asyncio.run(run())
+    assert client.counters["requests"] == 5
+    assert len(client.latencies) == 3
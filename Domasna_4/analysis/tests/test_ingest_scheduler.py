@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from Domasna_4.analysis.ingest_scheduler import IngestScheduler
+
+
+def make_scheduler(tmp_path, job):
+    return IngestScheduler(job, ttl=3600, check_interval=60, state_path=str(tmp_path / 'state.json'),
+                           lock_path=str(tmp_path / 'ingest.lock'))
+
+
+def failing_job():
+    raise ConnectionError("mse.mk is down")
+
+
+def test_failed_runs_back_off(tmp_path):
+    scheduler = make_scheduler(tmp_path, failing_job)
+    assert scheduler.is_due()
+
+    started = time.time()
+    assert scheduler.run_once()
+    status = scheduler.status()
+    assert status["stale"] and not scheduler.is_due()
+    assert status["last_attempt"] >= started and status["last_success"] is None
+    assert status["consecutive_failures"] == 1 and status["retry_backoff"] == 120
+    assert status["next_run_due"] == status["last_attempt"] + 120
+
+    for _ in range(6):
+        scheduler.run_once()
+    assert scheduler.status()["retry_backoff"] == 3600  # Capped at the ttl
+
+
+def test_success_clears_the_backoff(tmp_path):
+    scheduler = make_scheduler(tmp_path, failing_job)
+    scheduler.run_once()
+    scheduler.job = lambda: {"inserted": 0}
+    scheduler.run_once()
+    status = scheduler.status()
+    assert status["consecutive_failures"] == 0 and status["retry_backoff"] == 0
+    assert status["next_run_due"] == status["last_success"] + 3600
+    assert not scheduler.is_due()
+
+
+def test_lock_stays_fresh_during_a_long_run(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def long_job():
+        started.set()
+        release.wait(5)
+        return {"inserted": 0}
+
+    scheduler = make_scheduler(tmp_path, long_job)
+    scheduler.stale_lock_after, scheduler.lock_heartbeat = 0.3, 0.05
+    run = threading.Thread(target=scheduler.run_once)
+    run.start()
+    try:
+        started.wait(5)
+        time.sleep(0.6)  # Twice stale_lock_after since the lock was taken
+        other = make_scheduler(tmp_path, long_job)
+        other.stale_lock_after = 0.3
+        assert not other.run_once()
+    finally:
+        release.set()
+        run.join()
+    assert not os.path.exists(tmp_path / 'ingest.lock')
+
+
+def test_loop_survives_a_failed_check(tmp_path, monkeypatch):
+    ran = threading.Event()
+    scheduler = make_scheduler(tmp_path, lambda: ran.set())
+    scheduler.check_interval = 0.01
+    checks = []
+    is_due = scheduler.is_due
+
+    def flaky_is_due():
+        checks.append(1)
+        if len(checks) == 1:
+            raise OSError("state file unreadable")
+        return is_due()
+
+    monkeypatch.setattr(scheduler, 'is_due', flaky_is_due)
+    scheduler.start()
+
+    assert ran.wait(5)
+    assert scheduler.status()["scheduler_started"]
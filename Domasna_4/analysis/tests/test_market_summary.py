@@ -0,0 +1,19 @@
+import sqlite3
+
+from Domasna_4.analysis import DB
+
+
+def market_summary(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT * FROM DailyMarketSummary ORDER BY Symbol, Date').fetchall()
+
+
+def test_incremental_summary_matches_rebuild(incremental_db):
+    incremental = market_summary(incremental_db)
+
+    DB.rebuild_market_summary()
+
+    assert incremental
+    assert incremental == market_summary(incremental_db)
+    assert len({row[0] for row in incremental}) == 1  # Only the latest trading day
+    assert DB.retrieve_top_10()
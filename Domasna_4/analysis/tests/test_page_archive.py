@@ -0,0 +1,25 @@
+from Domasna_4.analysis import DB
+from Domasna_4.analysis.page_archive import PageArchive, first_missing_day, replay
+
+EMPTY_PAGE = '<html><body>No results</body></html>'
+
+
+def test_first_missing_day():
+    # Windows split only by a weekend or the New Year holidays cover their range
+    assert first_missing_day([('01/06/2020', '01/10/2020'), ('01/01/2020', '01/03/2020')]) is None
+    assert first_missing_day([('12/01/2020', '12/30/2020'), ('01/04/2021', '01/29/2021')]) is None
+    assert first_missing_day([('01/01/2020', '01/03/2020'), ('01/14/2020', '01/31/2020')]) == '01/04/2020'
+
+
+def test_replay_keeps_the_watermark_at_a_missing_window(migrated_db, tmp_path):
+    archive = PageArchive(str(tmp_path / 'page_archive'))
+    # ALK's middle window failed and was never archived; KMB's windows are contiguous
+    for issuer, from_date, to_date in (('ALK', '01/01/2020', '12/30/2020'), ('ALK', '07/01/2021', '06/30/2022'),
+                                       ('KMB', '01/01/2020', '12/30/2020'), ('KMB', '12/31/2020', '06/30/2022')):
+        archive.put(issuer, from_date, to_date, EMPTY_PAGE)
+
+    issuers, _ = replay(archive, reset=True, workers=1)
+
+    assert sorted(issuers) == ['ALK', 'KMB']
+    assert DB.get_last_saved_date('ALK') == '12/31/2020'
+    assert DB.get_last_saved_date('KMB') == '06/30/2022'
@@ -0,0 +1,25 @@
+import pytest
+
+from Domasna_4.analysis import DB
+
+PAGE_SIZE = 500
+
+
+@pytest.mark.parametrize('compacted', [False, True])
+def test_keyset_pages_match_unpaged_rows(migrated_db, compacted):
+    if compacted:
+        DB.compact_history(keep_years=2)
+    for issuer, search in (('ALL', None), ('ALL', 'AL'), ('KMB', None)):
+        expected = DB.extract_issuer_rows('2019-01-01', issuer, '2021-12-31', search)
+
+        pages, after = [], None
+        # Bounded, so a cursor that doesn't move forward fails instead of looping
+        for _ in range(len(expected) // PAGE_SIZE + 2):
+            page = DB.extract_issuer_rows('2019-01-01', issuer, '2021-12-31', search, after=after, limit=PAGE_SIZE)
+            if not page:
+                break
+            pages.extend(page)
+            after = (page[-1][1], page[-1][0])
+
+        assert expected
+        assert pages == expected
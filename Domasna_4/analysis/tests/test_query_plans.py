@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from Domasna_4.analysis import DB
+
+
+def is_full_scan(detail):
+    # "SCAN t USING [COVERING] INDEX ..." walks an index; a bare "SCAN t" reads the whole table
+    return detail.startswith('SCAN ') and ' USING ' not in detail and detail != 'SCAN CONSTANT ROW'
+
+
+def test_query_plans_use_indexes(migrated_db):
+    """Every DB.py query is answered from an index, none falls back to a full table scan."""
+    sample_date = datetime.now().strftime('%Y-%m-%d')
+    from_query, from_params = DB.build_issuer_rows_query(sample_date, 'ALK', sample_date)
+    all_query, all_params = DB.build_issuer_rows_query(sample_date, 'ALL', sample_date)
+    page_query, page_params = DB.build_issuer_rows_query(
+        sample_date, 'ALL', sample_date, search='AL', after=(sample_date, 'ALK'), limit=100
+    )
+    queries = {
+        'fetch_symbols': (DB.FETCH_SYMBOLS_QUERY, ()),
+        'fetch_symbols (live)': (DB.FETCH_LIVE_SYMBOLS_QUERY, ()),
+        'fetch_issuers': (DB.FETCH_ISSUERS_QUERY, ()),
+        'get_last_saved_date': (DB.LAST_SAVED_DATE_QUERY, ('ALK',)),
+        'get_symbol_watermark': (DB.SYMBOL_WATERMARK_QUERY, {'symbol': 'ALK'}),
+        'get_symbol_watermark (live)': (DB.SYMBOL_LIVE_WATERMARK_QUERY, {'symbol': 'ALK'}),
+        'fetch_symbol_history': (DB.SYMBOL_HISTORY_QUERY.format(source='StockData'), ('ALK',)),
+        'insert_stock_data (previous close)': (DB.PREVIOUS_CLOSE_QUERY, ('ALK', sample_date)),
+        'range_high_low (positions)': (DB.RANGE_POSITIONS_QUERY,
+                                       {'symbol': 'ALK', 'from_date': sample_date, 'to_date': sample_date}),
+        'high_low_screen (close)': (DB.LAST_CLOSE_QUERY, ('ALK', sample_date)),
+        'range_high_low': (DB.RANGE_EXTREMES_QUERY, ('ALK', 3, 0, 7)),
+        'rolling_high_low': (DB.RANGE_INDEX_LEVEL_QUERY, ('ALK', 3, 0, 100)),
+        'range_returns': (DB.RANGE_RETURNS_QUERY, {'from_date': sample_date, 'to_date': sample_date}),
+        'archive blocks': (DB.ARCHIVE_BLOCKS_QUERY, (2015, 2020)),
+        'archive blocks (symbol)': (DB.ARCHIVE_SYMBOL_BLOCKS_QUERY, (2015, 2020, 'ALK')),
+        'bulk_ingest (archived dates)': (DB.ARCHIVE_OVERLAP_QUERY,
+                                         {'symbol': 'ALK', 'from_year': 2015, 'to_year': 2016,
+                                          'from_date': '2015-03-01', 'to_date': '2016-02-01'}),
+        'update_last_date': (DB.UPDATE_LAST_DATE_QUERY, (sample_date, 'ALK')),
+        'extract_issuer_rows': (from_query, from_params),
+        'extract_issuer_rows (ALL)': (all_query, all_params),
+        'extract_issuer_rows (page)': (page_query, page_params),
+        'retrieve_top_10 (latest date)': (DB.LATEST_DATE_QUERY, ()),
+        'retrieve_top_10': (DB.TOP_10_QUERY, (sample_date,)),
+        'get_recommendation_counts': (DB.RECOMMENDATION_COUNTS_QUERY, ('ALK',)),
+        'trading_days': (DB.TRADING_DAYS_QUERY, (sample_date, sample_date)),
+        'last_trade_dates': (DB.LAST_TRADE_DATE_QUERY, {'symbol': 'ALK'}),
+        'last_trade_dates (live)': (DB.LAST_LIVE_TRADE_DATE_QUERY, {'symbol': 'ALK'}),
+        'fetch_checkpoints': (DB.FETCH_CHECKPOINTS_QUERY, ('ALK',)),
+        'bulk_ingest (checkpoints)': (DB.DELETE_FETCH_CHECKPOINTS_QUERY, ('ALK', sample_date)),
+    }
+
+    failures = []
+    for name, (query, params) in queries.items():
+        for detail in DB.explain_query_plan(query, params):
+            if is_full_scan(detail):
+                failures.append(f"{name}: {detail}")
+
+    assert not failures, "Queries falling back to a full table scan:\n" + "\n".join(failures)
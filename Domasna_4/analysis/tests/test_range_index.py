@@ -0,0 +1,54 @@
+import random
+import sqlite3
+
+from Domasna_4.analysis import DB
+
+
+def range_index(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT * FROM StockRangeIndex ORDER BY Symbol, Level, Position').fetchall()
+
+
+def test_incremental_index_matches_rebuild(incremental_db):
+    incremental = range_index(incremental_db)
+
+    DB.rebuild_returns()
+
+    assert incremental
+    assert incremental == range_index(incremental_db)
+
+
+def test_range_queries_match_brute_force(migrated_db):
+    history = DB.fetch_symbol_history('ALK')
+    dates = [row[0] for row in history]
+    # Days without a trade count with their carried-forward close
+    highs = [row[2] or row[5] for row in history]
+    lows = [row[3] or row[5] for row in history]
+
+    pick = random.Random(0)
+    for _ in range(50):
+        first, last = sorted(pick.sample(range(len(history)), 2))
+        assert DB.range_high_low('ALK', dates[first], dates[last]) == (
+            max(highs[first:last + 1]), min(lows[first:last + 1])
+        )
+    assert DB.range_high_low('ALK', '1990-01-01', '1990-12-31') is None
+
+    for window in (1, 5, 20, 250):
+        rolling_highs, rolling_lows = DB.rolling_high_low('ALK', window)
+        assert rolling_highs[:window - 1] == rolling_lows[:window - 1] == [None] * (window - 1)
+        for end in range(window - 1, len(history)):
+            assert rolling_highs[end] == max(highs[end - window + 1:end + 1])
+            assert rolling_lows[end] == min(lows[end - window + 1:end + 1])
+
+
+def test_high_low_screen_skips_symbols_without_prices(migrated_db):
+    _, latest, _ = DB.high_low_screen()
+    with sqlite3.connect(migrated_db) as connection:
+        connection.execute("INSERT INTO SymbolTracking (Symbol, LastDate) VALUES ('NOPX', NULL)")
+    DB.bulk_ingest([('NOPX', [[latest, None, None, None, None, None, 0, None, None]], None)])
+
+    _, _, screen = DB.high_low_screen()
+
+    assert screen
+    assert 'NOPX' not in {symbol for symbol, *_ in screen}
+    assert all(None not in row for row in screen)
@@ -0,0 +1,43 @@
+import sqlite3
+import threading
+
+from Domasna_4.analysis import DB
+
+
+def test_publish_finishes_under_concurrent_writes(migrated_db):
+    # Large enough that copying it a few pages at a time would take many steps
+    with sqlite3.connect(migrated_db) as connection:
+        connection.execute('CREATE TABLE Padding (Value BLOB)')
+        connection.executemany('INSERT INTO Padding (Value) VALUES (zeroblob(8192))', [()] * 2000)
+    stop = threading.Event()
+    writes = []
+
+    def writer():
+        connection = sqlite3.connect(migrated_db, timeout=30)
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS SnapshotWrites (Value INTEGER)')
+            while not stop.is_set():
+                connection.execute('INSERT INTO SnapshotWrites (Value) VALUES (?)', (len(writes),))
+                connection.commit()
+                writes.append(1)
+        finally:
+            connection.close()
+
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    try:
+        while not writes:
+            pass  # Publish once the writer is committing
+        published = []
+        publisher = threading.Thread(target=lambda: published.append(DB.publish_read_snapshot()))
+        publisher.start()
+        publisher.join(timeout=20)
+        assert not publisher.is_alive(), "snapshot kept restarting under concurrent writes"
+    finally:
+        stop.set()
+        writer_thread.join()
+
+    assert DB.current_read_snapshot() == published[0]
+    with sqlite3.connect(f"file:{published[0]}?mode=ro", uri=True) as snapshot:
+        assert snapshot.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+        assert snapshot.execute('SELECT COUNT(*) FROM StockData').fetchone()[0] > 0
@@ -0,0 +1,24 @@
+import sqlite3
+
+from Domasna_4.analysis import DB
+from Domasna_4.analysis.fundamental_analysis_service import fundamental_analysis_service as service
+
+
+def test_snapshot_without_counts_table(stock_db):
+    # The shipped database has all_info but no RecommendationCounts until init_createDB
+    DB.publish_read_snapshot()
+
+    assert service.get_recommendation_counts('ALK') == {"Buy": 0, "Sell": 0, "Hold": 0, "Recommendation": "Hold"}
+    assert service.get_all_recommendation_counts() == {}
+
+
+def test_init_creates_counts_table(migrated_db):
+    with sqlite3.connect(migrated_db) as connection:
+        connection.execute('DROP TABLE all_info')
+        connection.execute('DROP TABLE RecommendationCounts')
+    DB.init_createDB()
+    DB.publish_read_snapshot()
+
+    assert service.get_all_recommendation_counts() == {}
+    with sqlite3.connect(migrated_db) as connection:
+        assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'RecommendationCounts'").fetchone()
@@ -0,0 +1,51 @@
+import random
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from Domasna_4.analysis import DB
+from Domasna_4.analysis.technical_analysis.strategies.rsi import RSIIndicator
+
+
+def stored_returns(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT * FROM StockReturns ORDER BY Symbol, Date').fetchall()
+
+
+def test_incremental_returns_match_rebuild(incremental_db):
+    incremental = stored_returns(incremental_db)
+
+    DB.rebuild_returns()
+
+    assert incremental
+    assert incremental == stored_returns(incremental_db)
+
+
+def test_gap_days_keep_the_last_close():
+    prices = [10.0, None, 0.0, 12.0, 11.0, None, 13.0]
+    history = [(f"2024-01-{day:02d}", price, price, price, 100) for day, price in enumerate(prices, 1)]
+
+    changes = [row[2] for row in DB.derive_returns(history)]
+
+    # A day without a trade is unchanged, not a drop to 0 and back
+    assert changes == [None, 0.0, 0.0, 2.0, -1.0, 0.0, 2.0]
+    # So RSI over the stored changes is RSI of the carried-forward close
+    close = pd.Series(prices).replace(0, None).astype(float).ffill()
+    pd.testing.assert_series_equal(
+        RSIIndicator().calculate(close, window=3, change=pd.Series(changes, dtype=float)),
+        RSIIndicator().calculate(close, window=3)
+    )
+
+
+def test_range_returns_match_closes(migrated_db):
+    history = DB.fetch_symbol_history('ALK')
+    dates = [row[0] for row in history]
+    closes = [row[5] for row in history]
+
+    pick = random.Random(0)
+    for _ in range(50):
+        first, last = sorted(pick.sample(range(len(history)), 2))
+        returns = dict(DB.range_returns(dates[first], dates[last]))
+        assert returns['ALK'] == pytest.approx(closes[last] / closes[first] - 1)
+    assert 'ALK' not in dict(DB.range_returns('1990-01-01', dates[-1]))